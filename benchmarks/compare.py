@@ -0,0 +1,54 @@
+"""Сравнивает два отчёта benchmarks.run по каждому сценарию.
+
+    python -m benchmarks.compare before.json after.json
+"""
+import argparse
+import json
+
+METRICS = (
+    ("throughput_rps", ("throughput_rps",), True),
+    ("p50_ms", ("latency_ms", "p50"), False),
+    ("p95_ms", ("latency_ms", "p95"), False),
+    ("p99_ms", ("latency_ms", "p99"), False),
+    ("queries/req", ("db_queries_per_request",), False),
+)
+
+
+def pick(data: dict, path: tuple[str, ...]):
+    for key in path:
+        if not isinstance(data, dict) or key not in data:
+            return None
+        data = data[key]
+    return data
+
+
+def compare(before: dict, after: dict) -> dict:
+    result = {}
+    for scenario in before["scenarios"].keys() & after["scenarios"].keys():
+        rows = {}
+        for name, path, higher_is_better in METRICS:
+            old = pick(before["scenarios"][scenario], path)
+            new = pick(after["scenarios"][scenario], path)
+            if old is None or new is None:
+                continue
+            change = (new - old) / old * 100 if old else None
+            rows[name] = {
+                "before": old,
+                "after": new,
+                "change_pct": round(change, 1) if change is not None else None,
+                "better": (new >= old) if higher_is_better else (new <= old),
+            }
+        result[scenario] = rows
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("before")
+    parser.add_argument("after")
+    args = parser.parse_args()
+    with open(args.before, encoding="utf-8") as f:
+        before = json.load(f)
+    with open(args.after, encoding="utf-8") as f:
+        after = json.load(f)
+    print(json.dumps(compare(before, after), indent=2))
@@ -0,0 +1,58 @@
+"""Пропускная способность проверки JWT: jose.jwt.decode против decode_token.
+
+База не нужна. Запуск из корня репозитория:
+
+    python -m benchmarks.decode_token --tokens 100 --rounds 20000
+"""
+import os
+
+os.environ.setdefault("SECRET_KEY", "bench-secret")
+os.environ.setdefault("DB_PASS", "bench")
+os.environ.setdefault("DB_NAME", "bench")
+
+import argparse
+import json
+import random
+import time
+
+from jose import jwt
+
+from src.core.config import get_settings
+from src.core.security import create_access_token, decode_token
+
+
+def uncached_decode(token: str) -> dict:
+    settings = get_settings()
+    return jwt.decode(token,
+                      settings.SECURE.SECRET_KEY.get_secret_value(),
+                      algorithms=[settings.SECURE.HASH_ALGORITHM])
+
+
+def measure(decode, tokens: list[str], rounds: int) -> float:
+    picks = [random.choice(tokens) for _ in range(rounds)]
+    started = time.perf_counter()
+    for token in picks:
+        decode(token)
+    return rounds / (time.perf_counter() - started)
+
+
+def main(token_count: int, rounds: int) -> dict:
+    tokens = [create_access_token({"sub": str(i)})
+              for i in range(token_count)]
+    before = measure(uncached_decode, tokens, rounds)
+    after = measure(decode_token, tokens, rounds)
+    return {
+        "tokens": token_count,
+        "rounds": rounds,
+        "before_ops_per_s": round(before),
+        "after_ops_per_s": round(after),
+        "speedup": round(after / before, 1),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tokens", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=20_000)
+    args = parser.parse_args()
+    print(json.dumps(main(args.tokens, args.rounds), indent=2))
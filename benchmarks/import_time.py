@@ -0,0 +1,103 @@
+"""Бюджет времени старта по профилю `python -X importtime`.
+
+Проверяется выполнение кода в отдельном интерпретаторе: по умолчанию
+`import src.main`, который не должен тянуть FastAPI, SQLAlchemy, asyncpg,
+passlib и jose. Воркер uvicorn на деле выполняет create_app(), и его
+бюджет задаётся через --code. Время — настенное время выполнения кода,
+профиль импорта показывает самые медленные модули. Те же бюджеты
+проверяет tests/test_import_time.py. При нарушении скрипт завершается с
+кодом 1:
+
+    python -m benchmarks.import_time --budget-ms 150
+    python -m benchmarks.import_time --budget-ms 2500 \
+        --forbid asyncpg,passlib,jose \
+        --code "from src.main import create_app; create_app()"
+"""
+import argparse
+import json
+import subprocess
+import sys
+from collections.abc import Iterable
+
+HEAVY_PACKAGES = ("fastapi", "sqlalchemy", "asyncpg", "passlib", "jose")
+
+
+def profile(code: str,
+            env: dict[str, str] | None = None) -> tuple[dict[str, int],
+                                                         set[str], float]:
+    """Кумулятивное время импорта каждого модуля верхнего уровня в мкс,
+    имена всех импортированных модулей и настенное время кода в мс"""
+    timed = (f"import time\n_started = time.perf_counter()\n{code}\n"
+             "print((time.perf_counter() - _started) * 1000)")
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", timed],
+        capture_output=True, text=True, check=True, env=env,
+    )
+    cumulative: dict[str, int] = {}
+    imported: set[str] = set()
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative_us, raw_name = line.removeprefix("import time:").split("|")
+        cumulative_us = cumulative_us.strip()
+        if not cumulative_us.isdigit():
+            continue
+        name = raw_name.strip()
+        imported.add(name)
+        # Вложенные импорты идут с отступом, их время уже входит в родителя
+        if not raw_name.startswith("  "):
+            cumulative[name] = cumulative.get(name, 0) + int(cumulative_us)
+    return cumulative, imported, float(completed.stdout.splitlines()[-1])
+
+
+def check(code: str, budget_ms: float,
+          forbidden: Iterable[str] = HEAVY_PACKAGES, rounds: int = 3,
+          env: dict[str, str] | None = None) -> dict:
+    # Модули, которые интерпретатор грузит сам (site, .pth), не в счёт
+    _, baseline, _ = profile("pass", env)
+    # Берём лучший прогон: первый обычно платит за холодный кэш .pyc
+    runs = []
+    imported: set[str] = set()
+    for _ in range(rounds):
+        cumulative, names, wall_ms = profile(code, env)
+        runs.append((wall_ms, {name: us for name, us in cumulative.items()
+                               if name not in baseline}))
+        imported |= names
+    total_ms, best = min(runs, key=lambda run: run[0])
+    heavy = sorted({name.split(".")[0] for name in imported}
+                   & set(forbidden))
+
+    violations = []
+    if total_ms > budget_ms:
+        violations.append(f"{code!r} took {total_ms:.1f} ms, "
+                          f"budget {budget_ms:.1f} ms")
+    if heavy:
+        violations.append(f"{code!r} pulls in {', '.join(heavy)}")
+
+    slowest = sorted(best.items(), key=lambda item: item[1], reverse=True)
+    return {
+        "code": code,
+        "total_ms": round(total_ms, 1),
+        "budget_ms": budget_ms,
+        "heavy_imports": heavy,
+        "slowest_ms": {name: round(us / 1000, 1) for name, us in slowest[:10]},
+        "violations": violations,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--module", default="src.main")
+    parser.add_argument("--code", help="код вместо import MODULE")
+    parser.add_argument("--budget-ms", type=float, default=150.0)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--forbid", default=",".join(HEAVY_PACKAGES),
+                        help="пакеты, импорт которых — нарушение, "
+                             "через запятую; пусто — любые")
+    args = parser.parse_args()
+
+    report = check(args.code or f"import {args.module}", args.budget_ms,
+                   [name for name in args.forbid.split(",") if name],
+                   args.rounds)
+    print(json.dumps(report, indent=2))
+    sys.exit(1 if report["violations"] else 0)
@@ -0,0 +1,105 @@
+"""p99 латентности /users/me во время пачки одновременных логинов.
+
+Нужна поднятая база со схемой (см. .env). Запуск из корня репозитория:
+
+    python -m benchmarks.login_burst --logins 50 --probes 200
+
+Лимит частоты логинов выключен: все логины идут с одного адреса.
+"""
+import os
+
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+import uuid
+
+import httpx
+
+from src.main import create_app
+
+PASSWORD = "bench-password"
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))
+    return ordered[index]
+
+
+async def register_and_login(client: httpx.AsyncClient) -> tuple[str, str]:
+    email = f"bench-{uuid.uuid4().hex[:12]}@example.com"
+    response = await client.post("/auth/register", json={
+        "first_name": "Bench",
+        "second_name": "User",
+        "email": email,
+        "password": PASSWORD,
+        "role": "client",
+    })
+    response.raise_for_status()
+    response = await client.post("/auth/login",
+                                 data={"username": email,
+                                       "password": PASSWORD})
+    response.raise_for_status()
+    return email, response.json()["access_token"]
+
+
+async def probe_me(client: httpx.AsyncClient, token: str,
+                   probes: int) -> list[float]:
+    latencies = []
+    headers = {"Authorization": f"Bearer {token}"}
+    for _ in range(probes):
+        started = time.perf_counter()
+        response = await client.get("/users/me", headers=headers)
+        response.raise_for_status()
+        latencies.append((time.perf_counter() - started) * 1000)
+        await asyncio.sleep(0.005)
+    return latencies
+
+
+async def login(client: httpx.AsyncClient, email: str) -> int:
+    response = await client.post("/auth/login",
+                                 data={"username": email,
+                                       "password": PASSWORD})
+    return response.status_code
+
+
+def summary(latencies: list[float]) -> dict:
+    return {
+        "count": len(latencies),
+        "p50_ms": round(statistics.median(latencies), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "max_ms": round(max(latencies), 3),
+    }
+
+
+async def main(logins: int, probes: int) -> dict:
+    transport = httpx.ASGITransport(app=create_app())
+    async with httpx.AsyncClient(transport=transport,
+                                 base_url="http://bench") as client:
+        email, token = await register_and_login(client)
+
+        idle = await probe_me(client, token, probes)
+
+        burst = asyncio.gather(*(login(client, email) for _ in range(logins)))
+        under_load = await probe_me(client, token, probes)
+        statuses = await burst
+
+    return {
+        "logins": logins,
+        "login_statuses": {str(code): statuses.count(code)
+                           for code in sorted(set(statuses))},
+        "users_me_idle": summary(idle),
+        "users_me_during_logins": summary(under_load),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=50)
+    parser.add_argument("--probes", type=int, default=200)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(main(args.logins, args.probes)), indent=2))
@@ -0,0 +1,123 @@
+"""Байты на проводе и CPU на ответ для страницы GET /trainings: полное и
+компактное (compact=true) представление, без сжатия и в каждой доступной
+кодировке.
+
+База не нужна: строки генерируются тем же кодом, что и в benchmarks.seed
+(разные даты, время, упражнения, подходы и веса, часть тренировок не
+начата), и оборачиваются в ORM-подобные объекты. CPU — время процесса на
+валидацию, сериализацию и сжатие одного ответа.
+
+    python -m benchmarks.payload_size --items 50 --catalogue 300
+"""
+import argparse
+import json
+import random
+import time
+from decimal import Decimal
+from types import SimpleNamespace
+
+from pydantic_core import to_json
+
+from benchmarks.seed import make_exercise_rows, make_training_rows
+from src.core.compression import ENCODINGS, make_encoders
+from src.schemas.training import (TrainingCompactOut,
+                                  TrainingCompactPage,
+                                  TrainingOut,
+                                  TrainingPage)
+
+REPRESENTATIONS = {
+    "full": (TrainingPage, TrainingOut),
+    "compact": (TrainingCompactPage, TrainingCompactOut),
+}
+# Правдоподобные величины идентификаторов в живой базе
+FIRST_TRAINING_ID = 120_000
+FIRST_TRAINING_EXERCISE_ID = 600_000
+
+
+def make_rows(items: int, catalogue: int,
+              seed_value: int) -> list[SimpleNamespace]:
+    """Страница GET /trainings: тренировки одного дневника по убыванию даты"""
+    rng = random.Random(seed_value)
+    trainings = make_training_rows(rng, [1], items)
+    training_ids = list(range(FIRST_TRAINING_ID, FIRST_TRAINING_ID + items))
+    exercises = make_exercise_rows(rng, training_ids,
+                                   list(range(1, catalogue + 1)))
+
+    by_training = {training_id: [] for training_id in training_ids}
+    for row_id, row in enumerate(exercises, FIRST_TRAINING_EXERCISE_ID):
+        # Numeric(6, 2) из базы приходит Decimal
+        by_training[row["training_id"]].append(SimpleNamespace(
+            **{**row, "weight": Decimal(str(row["weight"]))}, id=row_id))
+
+    rows = [SimpleNamespace(**row, id=training_id,
+                            exercises=by_training[training_id])
+            for training_id, row in zip(training_ids, trainings)]
+    rows.sort(key=lambda row: (-row.date.toordinal(), row.id))
+    return rows
+
+
+def render(rows, representation: str) -> bytes:
+    page, item = REPRESENTATIONS[representation]
+    return to_json(page(items=[item.model_validate(t) for t in rows]))
+
+
+def cpu_per_call(fn, repeats: int) -> float:
+    started = time.process_time()
+    for _ in range(repeats):
+        fn()
+    return (time.process_time() - started) / repeats
+
+
+def main(items: int, catalogue: int, repeats: int, seed_value: int) -> dict:
+    rows = make_rows(items, catalogue, seed_value)
+    encoders = make_encoders(ENCODINGS)
+
+    results = []
+    for representation in REPRESENTATIONS:
+        body = render(rows, representation)
+        render_cpu = cpu_per_call(lambda: render(rows, representation),
+                                  repeats)
+        results.append({
+            "representation": representation,
+            "encoding": "identity",
+            "bytes": len(body),
+            "cpu_us": round(render_cpu * 1e6, 1),
+        })
+
+        for name, factory in encoders.items():
+            def compress():
+                encoder = factory()
+                return encoder.compress(body) + encoder.finish()
+
+            compressed = compress()
+            results.append({
+                "representation": representation,
+                "encoding": name,
+                "bytes": len(compressed),
+                "cpu_us": round(
+                    (render_cpu + cpu_per_call(compress, repeats)) * 1e6, 1),
+            })
+
+    baseline = results[0]["bytes"]
+    for result in results:
+        result["ratio"] = round(result["bytes"] / baseline, 3)
+    return {
+        "items": items,
+        "catalogue": catalogue,
+        "seed": seed_value,
+        "repeats": repeats,
+        "unavailable_encodings": [name for name in ENCODINGS
+                                  if name not in encoders],
+        "results": results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=50)
+    parser.add_argument("--catalogue", type=int, default=300)
+    parser.add_argument("--repeats", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    print(json.dumps(main(args.items, args.catalogue, args.repeats,
+                          args.seed), indent=2))
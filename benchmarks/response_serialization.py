@@ -0,0 +1,90 @@
+"""Запросов в секунду на странице из N тренировок: ответ через
+response_model (повторная валидация) против ModelResponse.
+
+База не нужна: обработчики отдают заранее собранные ORM-подобные объекты.
+
+    python -m benchmarks.response_serialization --items 200 --requests 500
+"""
+import argparse
+import asyncio
+import json
+import time
+from datetime import date, datetime, UTC
+from types import SimpleNamespace
+
+import httpx
+from fastapi import FastAPI
+
+from src.core.responses import ModelResponse
+from src.schemas.training import TrainingOut, TrainingPage
+
+
+def make_rows(count: int) -> list[SimpleNamespace]:
+    return [
+        SimpleNamespace(
+            id=i,
+            diary_id=1,
+            name=f"Тренировка {i}",
+            date=date(2025, 1, 1),
+            start_at=datetime.now(UTC),
+            end_at=None,
+            exercises=[
+                SimpleNamespace(id=i * 10 + j, exercise_id=j, order_index=j,
+                                sets_count=4, set_duration=None, weight=42.5)
+                for j in range(6)
+            ],
+        )
+        for i in range(count)
+    ]
+
+
+def make_app(rows: list[SimpleNamespace]) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/before", response_model=TrainingPage)
+    async def before():
+        return TrainingPage(
+            items=[TrainingOut.model_validate(t) for t in rows])
+
+    @app.get("/after", response_model=TrainingPage)
+    async def after():
+        return ModelResponse(TrainingPage(
+            items=[TrainingOut.model_validate(t) for t in rows]))
+
+    return app
+
+
+async def measure(client: httpx.AsyncClient, path: str,
+                  requests: int) -> float:
+    expected = (await client.get(path)).content
+    started = time.perf_counter()
+    for _ in range(requests):
+        response = await client.get(path)
+        assert response.status_code == 200
+    elapsed = time.perf_counter() - started
+    return requests / elapsed, len(expected)
+
+
+async def main(items: int, requests: int) -> dict:
+    app = make_app(make_rows(items))
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport,
+                                 base_url="http://bench") as client:
+        before, before_size = await measure(client, "/before", requests)
+        after, after_size = await measure(client, "/after", requests)
+    return {
+        "items": items,
+        "requests": requests,
+        "before_rps": round(before, 1),
+        "after_rps": round(after, 1),
+        "speedup": round(after / before, 2),
+        "body_bytes": {"before": before_size, "after": after_size},
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=500)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(main(args.items, args.requests)), indent=2))
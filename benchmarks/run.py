@@ -0,0 +1,299 @@
+"""Нагрузочные сценарии против приложения на данных из benchmarks.seed.
+
+По умолчанию приложение из src.main гоняется в процессе через
+httpx.ASGITransport, и тогда считаются ещё и SQL-запросы на запрос. С
+--base-url нагрузка идёт по сети на уже запущенный uvicorn (счётчик
+запросов к базе в этом режиме недоступен).
+
+Вся нагрузка идёт с одного адреса, поэтому лимит частоты логинов
+выключается (RATE_LIMIT_ENABLED=false, если не задано иное; для
+--base-url — в окружении сервера).
+
+Результат — JSON, который можно сравнить с другим прогоном через
+benchmarks.compare:
+
+    python -m benchmarks.seed --pairs 50 --trainings 200
+    python -m benchmarks.run --pairs 50 --concurrency 20 -o before.json
+"""
+import os
+
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+import argparse
+import asyncio
+import json
+import platform
+import random
+import statistics
+import subprocess
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from datetime import datetime, UTC
+
+import httpx
+
+from benchmarks.seed import PASSWORD, client_email, trainer_email
+
+SCENARIOS = ("login_storm", "history_browsing", "workout", "catalogue")
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))
+    return ordered[index]
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+        self.engine = None
+
+    def _on_execute(self, *args, **kwargs):
+        self.count += 1
+
+    def attach(self) -> None:
+        from sqlalchemy import event
+        from src.db.session import get_engine
+
+        self.engine = get_engine().sync_engine
+        event.listen(self.engine, "before_cursor_execute", self._on_execute)
+
+    def detach(self) -> None:
+        from sqlalchemy import event
+
+        if self.engine is not None:
+            event.remove(self.engine, "before_cursor_execute",
+                         self._on_execute)
+
+
+@dataclass
+class ScenarioResult:
+    latencies_ms: list[float] = field(default_factory=list)
+    errors: int = 0
+    statuses: dict[str, int] = field(default_factory=dict)
+
+    def record(self, started: float, response: httpx.Response) -> None:
+        self.latencies_ms.append((time.perf_counter() - started) * 1000)
+        code = str(response.status_code)
+        self.statuses[code] = self.statuses.get(code, 0) + 1
+        if response.status_code >= 400:
+            self.errors += 1
+
+
+async def timed(result: ScenarioResult, request: Awaitable[httpx.Response]):
+    started = time.perf_counter()
+    response = await request
+    result.record(started, response)
+    return response
+
+
+class Bench:
+    def __init__(self, client: httpx.AsyncClient, pairs: int,
+                 concurrency: int, requests: int, rng: random.Random):
+        self.client = client
+        self.pairs = pairs
+        self.concurrency = concurrency
+        self.requests = requests
+        self.rng = rng
+        self.client_tokens: list[dict] = []
+
+    async def _login(self, email: str) -> httpx.Response:
+        return await self.client.post("/auth/login",
+                                      data={"username": email,
+                                            "password": PASSWORD})
+
+    async def prepare(self) -> None:
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def login(i: int) -> dict:
+            async with semaphore:
+                response = await self._login(client_email(i))
+                response.raise_for_status()
+                token = response.json()["access_token"]
+                return {"Authorization": f"Bearer {token}"}
+
+        self.client_tokens = await asyncio.gather(
+            *(login(i) for i in range(self.pairs)))
+
+    async def _drive(self, worker: Callable[[int, ScenarioResult],
+                                            Awaitable[None]]
+                     ) -> ScenarioResult:
+        result = ScenarioResult()
+        queue: asyncio.Queue[int] = asyncio.Queue()
+        for i in range(self.requests):
+            queue.put_nowait(i)
+
+        async def loop():
+            while not queue.empty():
+                await worker(queue.get_nowait(), result)
+
+        await asyncio.gather(*(loop() for _ in range(self.concurrency)))
+        return result
+
+    async def login_storm(self) -> ScenarioResult:
+        async def worker(i: int, result: ScenarioResult):
+            email = (trainer_email if i % 2 else client_email)(
+                self.rng.randrange(self.pairs))
+            await timed(result, self._login(email))
+
+        return await self._drive(worker)
+
+    async def history_browsing(self) -> ScenarioResult:
+        async def worker(i: int, result: ScenarioResult):
+            headers = self.client_tokens[i % self.pairs]
+            params = {"limit": 20}
+            for _ in range(self.rng.randint(1, 5)):
+                response = await timed(result, self.client.get(
+                    "/trainings/", headers=headers, params=params))
+                if response.status_code != 200:
+                    return
+                cursor = response.json().get("next_cursor")
+                if not cursor:
+                    return
+                params = {"limit": 20, "cursor": cursor}
+
+        return await self._drive(worker)
+
+    async def workout(self) -> ScenarioResult:
+        pending: dict[int, list[int]] = {}
+        for i, headers in enumerate(self.client_tokens):
+            response = await self.client.get(
+                "/trainings/", headers=headers,
+                params={"stream": "true"})
+            pending[i] = [t["id"] for t in response.json()
+                          if t["start_at"] is None]
+
+        async def worker(i: int, result: ScenarioResult):
+            owner = i % self.pairs
+            if not pending[owner]:
+                return
+            training_id = pending[owner].pop()
+            headers = self.client_tokens[owner]
+            await timed(result, self.client.patch(
+                f"/trainings/{training_id}/start", headers=headers))
+            await timed(result, self.client.patch(
+                f"/trainings/{training_id}/finish", headers=headers))
+
+        return await self._drive(worker)
+
+    async def catalogue(self) -> ScenarioResult:
+        etag = None
+
+        async def worker(i: int, result: ScenarioResult):
+            nonlocal etag
+            headers = {}
+            if etag and i % 2:
+                headers["If-None-Match"] = etag
+            response = await timed(result, self.client.get(
+                "/exercises/", headers=headers))
+            etag = response.headers.get("etag", etag)
+
+        return await self._drive(worker)
+
+
+def summarize(result: ScenarioResult, elapsed: float,
+              queries: int | None) -> dict:
+    latencies = result.latencies_ms
+    count = len(latencies)
+    if not count:
+        return {"requests": 0}
+    return {
+        "requests": count,
+        "errors": result.errors,
+        "statuses": result.statuses,
+        "duration_s": round(elapsed, 3),
+        "throughput_rps": round(count / elapsed, 1),
+        "latency_ms": {
+            "mean": round(statistics.fmean(latencies), 3),
+            "p50": round(percentile(latencies, 50), 3),
+            "p95": round(percentile(latencies, 95), 3),
+            "p99": round(percentile(latencies, 99), 3),
+            "max": round(max(latencies), 3),
+        },
+        "db_queries_per_request": (round(queries / count, 2)
+                                   if queries is not None else None),
+    }
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def main(args: argparse.Namespace) -> dict:
+    counter = None
+    if args.base_url:
+        transport = None
+        base_url = args.base_url
+    else:
+        from src.main import create_app
+
+        app = create_app()
+        counter = QueryCounter()
+        counter.attach()
+        transport = httpx.ASGITransport(app=app)
+        base_url = "http://bench"
+
+    report = {
+        "meta": {
+            "started_at": datetime.now(UTC).isoformat(),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "target": args.base_url or "in-process",
+            "pairs": args.pairs,
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "env": {key: os.environ[key] for key in
+                    ("DB_POOL_SIZE", "DB_MAX_OVERFLOW", "RATE_LIMIT_ENABLED")
+                    if key in os.environ},
+        },
+        "scenarios": {},
+    }
+
+    limits = httpx.Limits(max_connections=args.concurrency * 2)
+    async with httpx.AsyncClient(transport=transport, base_url=base_url,
+                                 limits=limits, timeout=60) as client:
+        bench = Bench(client, args.pairs, args.concurrency, args.requests,
+                      random.Random(args.seed))
+        await bench.prepare()
+
+        for name in args.scenarios:
+            if counter is not None:
+                counter.count = 0
+            started = time.perf_counter()
+            result = await getattr(bench, name)()
+            elapsed = time.perf_counter() - started
+            report["scenarios"][name] = summarize(
+                result, elapsed, counter.count if counter else None)
+
+    if counter is not None:
+        counter.detach()
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pairs", type=int, default=50,
+                        help="сколько пар засеяно benchmarks.seed")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=500,
+                        help="итераций на сценарий")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS,
+                        default=list(SCENARIOS))
+    parser.add_argument("--base-url", default=None,
+                        help="адрес запущенного сервера вместо ASGI в процессе")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("-o", "--output", default=None)
+    args = parser.parse_args()
+
+    report = asyncio.run(main(args))
+    dumped = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(dumped + "\n")
+    print(dumped)
@@ -0,0 +1,171 @@
+"""Наполняет базу синтетическими данными для бенчмарков через модели приложения.
+
+Создаёт упражнения, тренеров, клиентов, по дневнику на пару тренер/клиент
+и историю тренировок в каждом дневнике. Пользователи получают почты вида
+bench-trainer-{i}@bench.local / bench-client-{i}@bench.local и общий пароль
+PASSWORD. Часть тренировок создаётся не начатыми, для сценария старт/финиш.
+
+    python -m benchmarks.seed --pairs 50 --trainings 200 --exercises 300
+"""
+import argparse
+import asyncio
+import json
+import random
+from datetime import date, datetime, timedelta, UTC
+
+from sqlalchemy import delete, insert, select
+
+from src.db.base import Base
+from src.db.session import get_engine, get_sessionmaker
+from src.db.stats import rebuild_week_stats
+from src.core.security import get_password_hash
+from src.models.diary import Diary
+from src.models.exercise import Exercise
+from src.models.training import Training, TrainingExercise
+from src.models.user import User
+
+PASSWORD = "bench-password"
+EMAIL_DOMAIN = "bench.local"
+EXERCISES_PER_TRAINING = 5
+PENDING_SHARE = 0.2
+
+
+def trainer_email(i: int) -> str:
+    return f"bench-trainer-{i}@{EMAIL_DOMAIN}"
+
+
+def client_email(i: int) -> str:
+    return f"bench-client-{i}@{EMAIL_DOMAIN}"
+
+
+def make_training_rows(rng: random.Random, diary_ids: list[int],
+                       trainings: int) -> list[dict]:
+    """Тренировки за последние три года; часть не начата"""
+    today = date.today()
+    rows = []
+    for diary_id in diary_ids:
+        for i in range(trainings):
+            pending = rng.random() < PENDING_SHARE
+            day = today - timedelta(days=rng.randint(0, 3 * 365))
+            start_at = None
+            end_at = None
+            if not pending:
+                start_at = datetime.combine(day, datetime.min.time(),
+                                            tzinfo=UTC)
+                start_at += timedelta(hours=rng.randint(6, 20))
+                end_at = start_at + timedelta(minutes=rng.randint(30, 120))
+            rows.append({"diary_id": diary_id,
+                         "name": f"Тренировка {i}",
+                         "date": day,
+                         "start_at": start_at,
+                         "end_at": end_at})
+    return rows
+
+
+def make_exercise_rows(rng: random.Random, training_ids: list[int],
+                       exercise_ids: list[int]) -> list[dict]:
+    rows = []
+    for training_id in training_ids:
+        picked = rng.sample(exercise_ids,
+                            min(EXERCISES_PER_TRAINING, len(exercise_ids)))
+        for order_index, exercise_id in enumerate(picked):
+            rows.append({
+                "training_id": training_id,
+                "exercise_id": exercise_id,
+                "order_index": order_index,
+                "sets_count": rng.randint(2, 5),
+                "set_duration": None,
+                "weight": round(rng.uniform(10, 120), 1),
+            })
+    return rows
+
+
+async def clear(db) -> None:
+    users = select(User.id).where(User.email.like(f"%@{EMAIL_DOMAIN}"))
+    diaries = select(Diary.id).where(Diary.trainer_id.in_(users))
+    trainings = select(Training.id).where(Training.diary_id.in_(diaries))
+    await db.execute(delete(TrainingExercise)
+                     .where(TrainingExercise.training_id.in_(trainings)))
+    await db.execute(delete(Training).where(Training.diary_id.in_(diaries)))
+    await db.execute(delete(Diary).where(Diary.trainer_id.in_(users)))
+    await db.execute(delete(User).where(User.email.like(f"%@{EMAIL_DOMAIN}")))
+
+
+async def seed(pairs: int, trainings: int, exercises: int,
+               seed_value: int) -> dict:
+    rng = random.Random(seed_value)
+
+    engine = get_engine()
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with get_sessionmaker()() as db:
+        await clear(db)
+
+        exercise_ids = list((await db.scalars(select(Exercise.id))).all())
+        missing = max(0, exercises - len(exercise_ids))
+        if missing:
+            result = await db.scalars(
+                insert(Exercise).returning(Exercise.id),
+                [{"name": f"Bench exercise {len(exercise_ids) + i}",
+                  "description": "Synthetic benchmark exercise",
+                  "is_weight": i % 2 == 0,
+                  "is_duration": i % 3 == 0}
+                 for i in range(missing)],
+            )
+            exercise_ids.extend(result.all())
+
+        password_hash = get_password_hash(PASSWORD)
+        users = [
+            {"first_name": "Bench", "second_name": role.title(),
+             "email": email(i), "password_hash": password_hash, "role": role}
+            for i in range(pairs)
+            for role, email in (("trainer", trainer_email),
+                                ("client", client_email))
+        ]
+        user_ids = (await db.scalars(
+            insert(User).returning(User.id, sort_by_parameter_order=True),
+            users,
+        )).all()
+
+        diary_ids = (await db.scalars(
+            insert(Diary).returning(Diary.id, sort_by_parameter_order=True),
+            [{"name": f"Bench diary {i}",
+              "trainer_id": user_ids[2 * i],
+              "client_id": user_ids[2 * i + 1]}
+             for i in range(pairs)],
+        )).all()
+
+        training_rows = make_training_rows(rng, diary_ids, trainings)
+        training_ids = (await db.scalars(
+            insert(Training).returning(Training.id,
+                                       sort_by_parameter_order=True),
+            training_rows,
+        )).all()
+
+        exercise_rows = make_exercise_rows(rng, training_ids, exercise_ids)
+        await db.execute(insert(TrainingExercise), exercise_rows)
+        await rebuild_week_stats(db)
+        await db.commit()
+
+    await engine.dispose()
+    return {
+        "pairs": pairs,
+        "exercises": len(exercise_ids),
+        "trainings": len(training_ids),
+        "training_exercises": len(exercise_rows),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pairs", type=int, default=50,
+                        help="число пар тренер/клиент (и дневников)")
+    parser.add_argument("--trainings", type=int, default=200,
+                        help="тренировок в каждом дневнике")
+    parser.add_argument("--exercises", type=int, default=300,
+                        help="минимальный размер каталога упражнений")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(seed(args.pairs, args.trainings,
+                                      args.exercises, args.seed)), indent=2))
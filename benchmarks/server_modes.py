@@ -0,0 +1,121 @@
+"""Сценарии benchmarks.run против настоящего сервера в двух режимах:
+один процесс uvicorn с --reload (как раньше в Dockerfile) и
+`python -m src.server` с несколькими воркерами.
+
+Перед каждым режимом база засевается заново через benchmarks.seed, чтобы
+сценарию workout хватило не начатых тренировок. Режим поднимается отдельным
+процессом на своём порту и останавливается после прогона:
+
+    python -m benchmarks.server_modes --workers 4 --concurrency 50
+"""
+import argparse
+import asyncio
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import httpx
+
+from benchmarks.compare import compare
+from benchmarks.run import SCENARIOS, main as run_scenarios
+
+MODES = {
+    "reload": ["-m", "uvicorn", "src.main:create_app", "--factory",
+               "--host", "127.0.0.1", "--port", "{port}", "--reload"],
+    "production": ["-m", "src.server"],
+}
+
+
+def start(mode: str, port: int, workers: int) -> subprocess.Popen:
+    env = {**os.environ,
+           "SERVER_HOST": "127.0.0.1",
+           "SERVER_PORT": str(port),
+           "SERVER_WORKERS": str(workers)}
+    command = [sys.executable,
+               *(part.format(port=port) for part in MODES[mode])]
+    return subprocess.Popen(command, env=env, start_new_session=True,
+                            stdout=subprocess.DEVNULL,
+                            stderr=subprocess.DEVNULL)
+
+
+def wait_ready(base_url: str, process: subprocess.Popen,
+               timeout: float) -> float:
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        if process.poll() is not None:
+            raise RuntimeError(f"server exited with {process.returncode}")
+        try:
+            if httpx.get(f"{base_url}/exercises/").status_code == 200:
+                return time.perf_counter() - started
+        except httpx.TransportError:
+            pass
+        time.sleep(0.1)
+    raise TimeoutError(f"{base_url} not ready after {timeout} s")
+
+
+def stop(process: subprocess.Popen) -> None:
+    # Сигнал всей группе: --reload и воркеры — дочерние процессы
+    os.killpg(process.pid, signal.SIGTERM)
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        os.killpg(process.pid, signal.SIGKILL)
+        process.wait()
+
+
+def reseed(args: argparse.Namespace) -> None:
+    subprocess.run([sys.executable, "-m", "benchmarks.seed",
+                    "--pairs", str(args.pairs),
+                    "--trainings", str(args.trainings),
+                    "--seed", str(args.seed)],
+                   check=True, stdout=subprocess.DEVNULL)
+
+
+def bench(mode: str, args: argparse.Namespace) -> dict:
+    reseed(args)
+    base_url = f"http://127.0.0.1:{args.port}"
+    process = start(mode, args.port, args.workers)
+    try:
+        ready = wait_ready(base_url, process, args.startup_timeout)
+        run_args = argparse.Namespace(
+            pairs=args.pairs, concurrency=args.concurrency,
+            requests=args.requests, scenarios=args.scenarios,
+            base_url=base_url, seed=args.seed)
+        report = asyncio.run(run_scenarios(run_args))
+    finally:
+        stop(process)
+    report["meta"]["mode"] = mode
+    report["meta"]["startup_s"] = round(ready, 3)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=0,
+                        help="воркеров в production-режиме, 0 — по числу CPU")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--pairs", type=int, default=50)
+    parser.add_argument("--trainings", type=int, default=200,
+                        help="тренировок в каждом дневнике при засеве")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS,
+                        default=list(SCENARIOS))
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--startup-timeout", type=float, default=60.0)
+    parser.add_argument("-o", "--output", default=None)
+    args = parser.parse_args()
+
+    reports = {mode: bench(mode, args) for mode in MODES}
+    result = {
+        "modes": reports,
+        "comparison": compare(reports["reload"], reports["production"]),
+    }
+    dumped = json.dumps(result, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(dumped + "\n")
+    print(dumped)
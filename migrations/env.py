@@ -3,7 +3,7 @@ from logging.config import fileConfig
 from sqlalchemy import engine_from_config, pool
 
 from src.db.base import Base
-from src.core.config import settings
+from src.core.config import get_settings
 
 config = context.config
 
@@ -13,7 +13,7 @@ if config.config_file_name is not None:
 target_metadata = Base.metadata
 
 def run_migrations_offline() -> None:
-    url = settings.DB.get_sync_url()
+    url = get_settings().DB.get_sync_url()
     context.configure(
         url=url,
         target_metadata=target_metadata,
@@ -26,7 +26,7 @@ def run_migrations_offline() -> None:
 
 def run_migrations_online() -> None:
     connectable = engine_from_config(
-        {"sqlalchemy.url": settings.DB.get_sync_url()},
+        {"sqlalchemy.url": get_settings().DB.get_sync_url()},
         prefix="sqlalchemy.",
         poolclass=pool.NullPool,
     )
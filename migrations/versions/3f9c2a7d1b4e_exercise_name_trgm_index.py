@@ -0,0 +1,46 @@
+"""exercise name trigram index
+
+Revision ID: 3f9c2a7d1b4e
+Revises: 
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f9c2a7d1b4e'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # CONCURRENTLY не блокирует запись в exercises, но не работает
+    # внутри транзакции
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_exercises_name_trgm",
+            "exercises",
+            ["name"],
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_exercises_name_trgm",
+            table_name="exercises",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
@@ -0,0 +1,44 @@
+"""training sets
+
+Revision ID: 8b1e4d6f2a90
+Revises: 3f9c2a7d1b4e
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b1e4d6f2a90'
+down_revision: Union[str, Sequence[str], None] = '3f9c2a7d1b4e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "training_sets",
+        sa.Column("id", sa.BigInteger(), nullable=False),
+        sa.Column("training_exercise_id", sa.Integer(), nullable=False),
+        sa.Column("set_number", sa.Integer(), nullable=False),
+        sa.Column("reps", sa.Integer(), nullable=True),
+        sa.Column("weight", sa.Numeric(6, 2), nullable=True),
+        sa.Column("duration", sa.Integer(), nullable=True),
+        sa.Column("completed_at", sa.TIMESTAMP(timezone=True),
+                  server_default=sa.text("now()"), nullable=False),
+        sa.ForeignKeyConstraint(["training_exercise_id"],
+                                ["training_exercises.id"],
+                                ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("training_exercise_id", "set_number",
+                            name="uq_training_set"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("training_sets")
@@ -0,0 +1,89 @@
+"""week stats
+
+Revision ID: c4d7e2a91f35
+Revises: 8b1e4d6f2a90
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4d7e2a91f35'
+down_revision: Union[str, Sequence[str], None] = '8b1e4d6f2a90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_COMPLETED = "t.start_at IS NOT NULL AND t.end_at IS NOT NULL"
+_WEEK = "date_trunc('week', t.date::timestamp)::date"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "training_week_stats",
+        sa.Column("diary_id", sa.Integer(), nullable=False),
+        sa.Column("week_start", sa.Date(), nullable=False),
+        sa.Column("trainings", sa.Integer(), nullable=False),
+        sa.Column("completed", sa.Integer(), nullable=False),
+        sa.Column("duration_seconds", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["diary_id"], ["diarys.id"],
+                                ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("diary_id", "week_start"),
+        if_not_exists=True,
+    )
+    op.create_table(
+        "exercise_week_stats",
+        sa.Column("diary_id", sa.Integer(), nullable=False),
+        sa.Column("week_start", sa.Date(), nullable=False),
+        sa.Column("exercise_id", sa.Integer(), nullable=False),
+        sa.Column("trainings", sa.Integer(), nullable=False),
+        sa.Column("sets", sa.Integer(), nullable=False),
+        sa.Column("volume", sa.Numeric(14, 2), nullable=False),
+        sa.ForeignKeyConstraint(["diary_id"], ["diarys.id"],
+                                ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["exercise_id"], ["exercises.id"],
+                                ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("diary_id", "week_start", "exercise_id"),
+        if_not_exists=True,
+    )
+
+    # Заполнение по существующей истории — то же, что rebuild_week_stats
+    # (src/db/stats.py); таблицы могли создаться через create_all
+    op.execute("DELETE FROM exercise_week_stats")
+    op.execute("DELETE FROM training_week_stats")
+    op.execute(f"""
+        INSERT INTO training_week_stats
+            (diary_id, week_start, trainings, completed, duration_seconds)
+        SELECT t.diary_id,
+               {_WEEK},
+               count(*),
+               count(*) FILTER (WHERE {_COMPLETED}),
+               round(coalesce(sum(extract(epoch FROM t.end_at - t.start_at))
+                              FILTER (WHERE {_COMPLETED}), 0))::integer
+        FROM trainings t
+        GROUP BY t.diary_id, {_WEEK}
+    """)
+    op.execute(f"""
+        INSERT INTO exercise_week_stats
+            (diary_id, week_start, exercise_id, trainings, sets, volume)
+        SELECT t.diary_id,
+               {_WEEK},
+               te.exercise_id,
+               count(DISTINCT t.id),
+               sum(te.sets_count),
+               coalesce(sum(te.sets_count * te.weight), 0)
+        FROM trainings t
+        JOIN training_exercises te ON te.training_id = t.id
+        WHERE {_COMPLETED}
+        GROUP BY t.diary_id, {_WEEK}, te.exercise_id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("exercise_week_stats")
+    op.drop_table("training_week_stats")
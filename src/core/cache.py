@@ -0,0 +1,58 @@
+from time import monotonic
+from threading import Lock
+from collections import OrderedDict
+from typing import Any, Hashable
+
+_MISSING = object()
+
+class TTLCache:
+    """LRU-кэш с ограничением размера и временем жизни записей."""
+
+    def __init__(self, maxsize: int, ttl: float, track_stats: bool = True):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.track_stats = track_stats
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is not _MISSING and item[0] > monotonic():
+                self._data.move_to_end(key)
+                if self.track_stats:
+                    self.hits += 1
+                return item[1]
+            if item is not _MISSING:
+                del self._data[key]
+            if self.track_stats:
+                self.misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None) -> None:
+        if self.maxsize <= 0:
+            return
+        expires_at = monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
@@ -0,0 +1,303 @@
+"""Сжатие ответов по Accept-Encoding.
+
+gzip есть всегда. brotli (пакет brotli или brotlicffi) и zstd
+(compression.zstd из Python 3.14 или пакет zstandard) включаются, если
+установлены. Из кодировок, которые принимает клиент, выбирается первая
+по порядку сервера: zstd и brotli на JSON дают меньше байт при меньшем
+или сравнимом CPU.
+
+Ответ целиком сжимается, только если он не меньше minimum_size: на
+маленьких телах заголовки формата съедают выигрыш. Потоковые ответы
+(NDJSON, stream=true) сжимаются по кускам с flush, чтобы клиент получал
+данные по мере чтения курсора. SSE не сжимается: события должны уходить
+сразу.
+"""
+import zlib
+from collections.abc import Callable, Iterable
+from typing import Protocol
+
+ENCODINGS = ("zstd", "br", "gzip")
+_COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson",
+                       "text/plain", "text/html", "text/csv")
+_SKIP_STATUSES = frozenset({204, 206, 304})
+
+
+class Encoder(Protocol):
+    def compress(self, data: bytes) -> bytes: ...
+
+    def flush(self) -> bytes:
+        """Отдаёт всё накопленное, не закрывая поток"""
+
+    def finish(self) -> bytes: ...
+
+
+class _GzipEncoder:
+    def __init__(self, level: int):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+def _brotli_factory(quality: int) -> Callable[[], Encoder] | None:
+    try:
+        import brotli
+    except ImportError:
+        try:
+            import brotlicffi as brotli
+        except ImportError:
+            return None
+
+    class BrotliEncoder:
+        def __init__(self):
+            self._compressor = brotli.Compressor(quality=quality)
+
+        def compress(self, data: bytes) -> bytes:
+            return self._compressor.process(data)
+
+        def flush(self) -> bytes:
+            return self._compressor.flush()
+
+        def finish(self) -> bytes:
+            return self._compressor.finish()
+
+    return BrotliEncoder
+
+
+def _zstd_factory(level: int) -> Callable[[], Encoder] | None:
+    try:
+        from compression import zstd
+    except ImportError:
+        try:
+            import zstandard
+        except ImportError:
+            return None
+
+        class ZstandardEncoder:
+            def __init__(self):
+                self._compressor = (zstandard.ZstdCompressor(level=level)
+                                    .compressobj())
+
+            def compress(self, data: bytes) -> bytes:
+                return self._compressor.compress(data)
+
+            def flush(self) -> bytes:
+                return self._compressor.flush(
+                    zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+            def finish(self) -> bytes:
+                return self._compressor.flush()
+
+        return ZstandardEncoder
+
+    class ZstdEncoder:
+        def __init__(self):
+            self._compressor = zstd.ZstdCompressor(level=level)
+
+        def compress(self, data: bytes) -> bytes:
+            return self._compressor.compress(data)
+
+        def flush(self) -> bytes:
+            return self._compressor.flush(zstd.ZstdCompressor.FLUSH_BLOCK)
+
+        def finish(self) -> bytes:
+            return self._compressor.flush()
+
+    return ZstdEncoder
+
+
+def make_encoders(encodings: Iterable[str], gzip_level: int = 6,
+                  brotli_quality: int = 4,
+                  zstd_level: int = 3) -> dict[str, Callable[[], Encoder]]:
+    """Фабрики кодировщиков в порядке предпочтения; недоступные пропускаются"""
+    factories = {
+        "gzip": lambda: (lambda: _GzipEncoder(gzip_level)),
+        "br": lambda: _brotli_factory(brotli_quality),
+        "zstd": lambda: _zstd_factory(zstd_level),
+    }
+    encoders = {}
+    for name in encodings:
+        if name not in factories:
+            raise ValueError(f"Неизвестная кодировка {name!r}, "
+                             f"доступны {', '.join(ENCODINGS)}")
+        factory = factories[name]()
+        if factory is not None:
+            encoders[name] = factory
+    return encoders
+
+
+def parse_accept_encoding(header: str) -> dict[str, float]:
+    """"gzip, br;q=0.5" -> {"gzip": 1.0, "br": 0.5}"""
+    accepted = {}
+    for part in header.split(","):
+        name, *params = part.strip().split(";")
+        quality = 1.0
+        for param in params:
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if name:
+            accepted[name.strip().lower()] = quality
+    return accepted
+
+
+def choose_encoding(header: str, available: Iterable[str]) -> str | None:
+    accepted = parse_accept_encoding(header)
+    for name in available:
+        if accepted.get(name, accepted.get("*", 0.0)) > 0:
+            return name
+    return None
+
+
+def _is_compressible(content_type: str) -> bool:
+    media_type = content_type.split(";")[0].strip().lower()
+    return media_type in _COMPRESSIBLE_TYPES or media_type.endswith("+json")
+
+
+class CompressionMiddleware:
+    """Сжимает ответ выбранной по Accept-Encoding кодировкой. Vary:
+    Accept-Encoding получает каждый ответ, который мог бы быть сжат, —
+    и маленький, и отданный клиенту без Accept-Encoding, — иначе кэш
+    отдал бы его всем клиентам"""
+
+    def __init__(self, app, encoders: dict[str, Callable[[], Encoder]],
+                 minimum_size: int = 1024):
+        self.app = app
+        self.encoders = encoders
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = ""
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept_encoding = value.decode("latin-1")
+                break
+        encoding = choose_encoding(accept_encoding, self.encoders)
+
+        start = None
+        encoder: Encoder | None = None
+
+        async def send_wrapper(message):
+            nonlocal start, encoder
+            if message["type"] == "http.response.start":
+                headers = message.get("headers", [])
+                if message["status"] == 304:
+                    # Тела нет, но Vary и ETag должны совпасть с ответом
+                    # 200, который этот клиент получил бы
+                    if encoding is not None:
+                        headers = _weak_etag(headers)
+                    message["headers"] = _with_vary(headers)
+                    await send(message)
+                    return
+                if encoding is None:
+                    if _is_compressible_response(message["status"],
+                                                 headers):
+                        message["headers"] = _with_vary(headers)
+                    await send(message)
+                    return
+                # Решение откладывается до первого куска тела
+                start = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if start is not None:
+                headers = start.get("headers", [])
+                if self._should_compress(start["status"], headers, body,
+                                         more_body):
+                    encoder = self.encoders[encoding]()
+                    headers = _encoded_headers(headers, encoding)
+                    if not more_body:
+                        body = encoder.compress(body) + encoder.finish()
+                        headers.append((b"content-length",
+                                        str(len(body)).encode()))
+                    start["headers"] = headers
+                elif _is_compressible_response(start["status"], headers):
+                    start["headers"] = _with_vary(headers)
+                await send(start)
+                start = None
+                if encoder is None or not more_body:
+                    await send({"type": "http.response.body", "body": body,
+                                "more_body": more_body})
+                    return
+            if encoder is None:
+                await send(message)
+                return
+
+            data = encoder.compress(body)
+            data += encoder.flush() if more_body else encoder.finish()
+            await send({"type": "http.response.body", "body": data,
+                        "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
+
+    def _should_compress(self, status: int,
+                         headers: list[tuple[bytes, bytes]], body: bytes,
+                         more_body: bool) -> bool:
+        if not _is_compressible_response(status, headers):
+            return False
+        return more_body or len(body) >= self.minimum_size
+
+
+def _is_compressible_response(status: int,
+                              headers: list[tuple[bytes, bytes]]) -> bool:
+    if status < 200 or status in _SKIP_STATUSES:
+        return False
+    content_type = b""
+    for name, value in headers:
+        if name == b"content-encoding":
+            return False
+        if name == b"content-type":
+            content_type = value
+    return _is_compressible(content_type.decode("latin-1"))
+
+
+def _with_vary(
+    headers: list[tuple[bytes, bytes]],
+) -> list[tuple[bytes, bytes]]:
+    result = []
+    vary = None
+    for name, value in headers:
+        if name == b"vary":
+            vary = value
+            continue
+        result.append((name, value))
+    if vary is None:
+        vary = b"Accept-Encoding"
+    elif b"accept-encoding" not in vary.lower() and vary.strip() != b"*":
+        vary += b", Accept-Encoding"
+    result.append((b"vary", vary))
+    return result
+
+
+def _weak_etag(
+    headers: list[tuple[bytes, bytes]],
+) -> list[tuple[bytes, bytes]]:
+    # Сжатое тело — другое представление, сильный ETag ему не подходит
+    return [(name, b"W/" + value
+             if name == b"etag" and not value.startswith(b"W/") else value)
+            for name, value in headers]
+
+
+def _encoded_headers(headers: list[tuple[bytes, bytes]],
+                     encoding: str) -> list[tuple[bytes, bytes]]:
+    result = [(name, value) for name, value in _weak_etag(headers)
+              if name != b"content-length"]
+    result.append((b"content-encoding", encoding.encode()))
+    return _with_vary(result)
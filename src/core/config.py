@@ -13,6 +13,23 @@ class DBSettings(BaseSettings):
     DB_NAME: str = Field(..., alias="DB_NAME")
     DB_POOL_SIZE: int = Field(default=10, alias="DB_POOL_SIZE")
     DB_MAX_OVERFLOW: int = Field(default=5, alias="DB_MAX_OVERFLOW")
+    DB_POOL_TIMEOUT: float = Field(default=30.0, alias="DB_POOL_TIMEOUT")
+    DB_POOL_RECYCLE: int = Field(default=1800, alias="DB_POOL_RECYCLE")
+    DB_POOL_PRE_PING: bool = Field(default=True, alias="DB_POOL_PRE_PING")
+    DB_POOL_WARMUP: bool = Field(default=True, alias="DB_POOL_WARMUP")
+    DB_STATEMENT_CACHE_SIZE: int = Field(default=100,
+                                         alias="DB_STATEMENT_CACHE_SIZE")
+    DB_ECHO: bool = Field(default=False, alias="DB_ECHO")
+    DB_CREATE_ALL: bool = Field(default=True, alias="DB_CREATE_ALL")
+    DB_REPLICA_URL: SecretStr | None = Field(default=None,
+                                             alias="DB_REPLICA_URL")
+    DB_REPLICA_PIN_SECONDS: float = Field(default=5.0,
+                                          alias="DB_REPLICA_PIN_SECONDS")
+    DB_REPLICA_PIN_BACKEND: Literal["memory", "redis"] = Field(
+        default="memory", alias="DB_REPLICA_PIN_BACKEND")
+    DB_REPLICA_PIN_REDIS_URL: str = Field(
+        default="redis://localhost:6379/0", alias="DB_REPLICA_PIN_REDIS_URL")
+    DB_MAX_CONNECTIONS: int = Field(default=0, alias="DB_MAX_CONNECTIONS")
 
     def get_async_url(self) -> str:
         return (
@@ -20,6 +37,11 @@ class DBSettings(BaseSettings):
             f"@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
         )
 
+    def get_replica_async_url(self) -> str | None:
+        if self.DB_REPLICA_URL is None:
+            return None
+        return self.DB_REPLICA_URL.get_secret_value() or None
+
     def get_sync_url(self) -> str:
         return (
             f"postgresql+psycopg://{self.DB_USER}:{self.DB_PASS.get_secret_value()}"
@@ -37,13 +59,150 @@ class SecureSettings(BaseSettings):
     SECRET_KEY: SecretStr = Field(..., alias="SECRET_KEY")
     HASH_ALGORITHM: str = Field(default="HS256", alias="HASH_ALGORITHM")
     TOKEN_LIFETIME_DAYS: int = Field(default=7, alias="TOKEN_LIFETIME_DAYS")
+    HASH_WORKERS: int = Field(default=4, alias="HASH_WORKERS")
+    HASH_QUEUE_LIMIT: int = Field(default=32, alias="HASH_QUEUE_LIMIT")
+    TOKEN_CACHE_SIZE: int = Field(default=50_000, alias="TOKEN_CACHE_SIZE")
+    TOKEN_CACHE_TTL: float = Field(default=3600.0, alias="TOKEN_CACHE_TTL")
 
     model_config = SettingsConfigDict(extra="ignore")
 
+class CacheSettings(BaseSettings):
+    USER_CACHE_SIZE: int = Field(default=10_000, alias="USER_CACHE_SIZE")
+    USER_CACHE_TTL: float = Field(default=60.0, alias="USER_CACHE_TTL")
+    CACHE_STATS: bool = Field(default=True, alias="CACHE_STATS")
+    EXERCISE_CACHE_TTL: float = Field(default=300.0,
+                                      alias="EXERCISE_CACHE_TTL")
+    EXERCISE_CACHE_MAX_AGE: int = Field(default=60,
+                                        alias="EXERCISE_CACHE_MAX_AGE")
+
+    model_config = SettingsConfigDict(
+        env_file=".env",
+        extra="ignore",
+        case_sensitive=False,
+    )
+
+class MetricsSettings(BaseSettings):
+    METRICS_ENABLED: bool = Field(default=True, alias="METRICS_ENABLED")
+    METRICS_SERVER_TIMING: bool = Field(default=True,
+                                        alias="METRICS_SERVER_TIMING")
+    METRICS_QUERY_BUDGET: int = Field(default=10,
+                                      alias="METRICS_QUERY_BUDGET")
+
+    model_config = SettingsConfigDict(
+        env_file=".env",
+        extra="ignore",
+        case_sensitive=False,
+    )
+
+class RateLimitSettings(BaseSettings):
+    RATE_LIMIT_ENABLED: bool = Field(default=True, alias="RATE_LIMIT_ENABLED")
+    RATE_LIMIT_BACKEND: Literal["memory", "redis"] = Field(
+        default="memory", alias="RATE_LIMIT_BACKEND")
+    RATE_LIMIT_REDIS_URL: str = Field(default="redis://localhost:6379/0",
+                                      alias="RATE_LIMIT_REDIS_URL")
+    RATE_LIMIT_BUCKETS: int = Field(default=100_000,
+                                    alias="RATE_LIMIT_BUCKETS")
+    RATE_LIMIT_LOGIN_IP: str = Field(default="30/minute",
+                                     alias="RATE_LIMIT_LOGIN_IP")
+    RATE_LIMIT_LOGIN_USER: str = Field(default="10/minute",
+                                       alias="RATE_LIMIT_LOGIN_USER")
+    RATE_LIMIT_REGISTER_IP: str = Field(default="10/hour",
+                                        alias="RATE_LIMIT_REGISTER_IP")
+
+    model_config = SettingsConfigDict(
+        env_file=".env",
+        extra="ignore",
+        case_sensitive=False,
+    )
+
+class EventsSettings(BaseSettings):
+    EVENTS_MAX_CONNECTIONS: int = Field(default=1000,
+                                        alias="EVENTS_MAX_CONNECTIONS")
+    EVENTS_MAX_PER_DIARY: int = Field(default=5, alias="EVENTS_MAX_PER_DIARY")
+    EVENTS_QUEUE_SIZE: int = Field(default=100, alias="EVENTS_QUEUE_SIZE")
+    EVENTS_HEARTBEAT_SECONDS: float = Field(default=15.0,
+                                            alias="EVENTS_HEARTBEAT_SECONDS")
+
+    model_config = SettingsConfigDict(
+        env_file=".env",
+        extra="ignore",
+        case_sensitive=False,
+    )
+
+class CompressionSettings(BaseSettings):
+    COMPRESSION_ENABLED: bool = Field(default=True,
+                                      alias="COMPRESSION_ENABLED")
+    COMPRESSION_ENCODINGS: str = Field(default="zstd,br,gzip",
+                                       alias="COMPRESSION_ENCODINGS")
+    COMPRESSION_MINIMUM_SIZE: int = Field(default=1024,
+                                          alias="COMPRESSION_MINIMUM_SIZE")
+    COMPRESSION_GZIP_LEVEL: int = Field(default=6,
+                                        alias="COMPRESSION_GZIP_LEVEL")
+    COMPRESSION_BROTLI_QUALITY: int = Field(default=4,
+                                            alias="COMPRESSION_BROTLI_QUALITY")
+    COMPRESSION_ZSTD_LEVEL: int = Field(default=3,
+                                        alias="COMPRESSION_ZSTD_LEVEL")
+
+    def get_encodings(self) -> list[str]:
+        return [name.strip() for name in self.COMPRESSION_ENCODINGS.split(",")
+                if name.strip()]
+
+    model_config = SettingsConfigDict(
+        env_file=".env",
+        extra="ignore",
+        case_sensitive=False,
+    )
+
+class IdempotencySettings(BaseSettings):
+    IDEMPOTENCY_ENABLED: bool = Field(default=True,
+                                      alias="IDEMPOTENCY_ENABLED")
+    IDEMPOTENCY_BACKEND: Literal["memory", "redis"] = Field(
+        default="memory", alias="IDEMPOTENCY_BACKEND")
+    IDEMPOTENCY_REDIS_URL: str = Field(default="redis://localhost:6379/0",
+                                       alias="IDEMPOTENCY_REDIS_URL")
+    IDEMPOTENCY_KEYS: int = Field(default=100_000, alias="IDEMPOTENCY_KEYS")
+    IDEMPOTENCY_TTL: float = Field(default=86400.0, alias="IDEMPOTENCY_TTL")
+    IDEMPOTENCY_LOCK_TTL: float = Field(default=60.0,
+                                        alias="IDEMPOTENCY_LOCK_TTL")
+    IDEMPOTENCY_MAX_BODY: int = Field(default=1_048_576,
+                                      alias="IDEMPOTENCY_MAX_BODY")
+
+    model_config = SettingsConfigDict(
+        env_file=".env",
+        extra="ignore",
+        case_sensitive=False,
+    )
+
+class ServerSettings(BaseSettings):
+    SERVER_HOST: str = Field(default="0.0.0.0", alias="SERVER_HOST")
+    SERVER_PORT: int = Field(default=8000, alias="SERVER_PORT")
+    SERVER_WORKERS: int = Field(default=0, alias="SERVER_WORKERS")
+    SERVER_KEEP_ALIVE: int = Field(default=5, alias="SERVER_KEEP_ALIVE")
+    SERVER_BACKLOG: int = Field(default=2048, alias="SERVER_BACKLOG")
+    SERVER_LIMIT_CONCURRENCY: int = Field(default=0,
+                                          alias="SERVER_LIMIT_CONCURRENCY")
+    SERVER_MAX_REQUESTS: int = Field(default=0, alias="SERVER_MAX_REQUESTS")
+
+    model_config = SettingsConfigDict(
+        env_file=".env",
+        extra="ignore",
+        case_sensitive=False,
+    )
+
 class Settings(BaseSettings):
     ENVIRONMENT: Environment = "development"
     DB: DBSettings = Field(default_factory=DBSettings)
     SECURE: SecureSettings = Field(default_factory=SecureSettings)
+    CACHE: CacheSettings = Field(default_factory=CacheSettings)
+    METRICS: MetricsSettings = Field(default_factory=MetricsSettings)
+    SERVER: ServerSettings = Field(default_factory=ServerSettings)
+    RATE_LIMIT: RateLimitSettings = Field(default_factory=RateLimitSettings)
+    EVENTS: EventsSettings = Field(default_factory=EventsSettings)
+    IDEMPOTENCY: IdempotencySettings = Field(
+        default_factory=IdempotencySettings)
+    COMPRESSION: CompressionSettings = Field(
+        default_factory=CompressionSettings)
+    SHUTDOWN_DRAIN_TIMEOUT: float = 10.0
 
     model_config = SettingsConfigDict(
         env_file=".env",
@@ -53,8 +212,43 @@ class Settings(BaseSettings):
     )
 
 
+def validate_settings(settings: Settings) -> list[str]:
+    """Падает на заведомо нерабочей конфигурации, возвращает предупреждения"""
+    if not settings.SECURE.SECRET_KEY.get_secret_value():
+        raise ValueError("SECRET_KEY не задан")
+    if settings.DB.DB_POOL_SIZE < 1:
+        raise ValueError("DB_POOL_SIZE должен быть не меньше 1")
+    connections = (max(1, settings.SERVER.SERVER_WORKERS)
+                   * (settings.DB.DB_POOL_SIZE + settings.DB.DB_MAX_OVERFLOW))
+    if 0 < settings.DB.DB_MAX_CONNECTIONS < connections:
+        raise ValueError(f"Воркерам может понадобиться {connections} "
+                         f"соединений, а DB_MAX_CONNECTIONS "
+                         f"{settings.DB.DB_MAX_CONNECTIONS}")
+
+    # Состояние в памяти видит только свой воркер
+    if settings.SERVER.SERVER_WORKERS > 1:
+        if (settings.DB.get_replica_async_url() is not None
+                and settings.DB.DB_REPLICA_PIN_BACKEND == "memory"):
+            raise ValueError("С репликой и несколькими воркерами нужен "
+                             "DB_REPLICA_PIN_BACKEND=redis")
+
+    warnings = []
+    if (settings.SERVER.SERVER_WORKERS > 1
+            and settings.IDEMPOTENCY.IDEMPOTENCY_ENABLED
+            and settings.IDEMPOTENCY.IDEMPOTENCY_BACKEND == "memory"):
+        # Повтор, попавший в тот же воркер, всё равно отсекается, так что
+        # это не повод не стартовать
+        warnings.append("IDEMPOTENCY_BACKEND=memory при нескольких "
+                        "воркерах: повтор, попавший в другой воркер, "
+                        "выполнится заново; нужен IDEMPOTENCY_BACKEND=redis")
+    if settings.ENVIRONMENT == "production":
+        if len(settings.SECURE.SECRET_KEY.get_secret_value()) < 32:
+            warnings.append("SECRET_KEY короче 32 символов")
+        if settings.DB.DB_ECHO:
+            warnings.append("DB_ECHO включён в production")
+    return warnings
+
+
 @lru_cache()
 def get_settings() -> Settings:
-    return Settings()
-
-settings = get_settings()
\ No newline at end of file
+    return Settings()
\ No newline at end of file
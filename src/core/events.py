@@ -0,0 +1,274 @@
+"""События дневника в реальном времени (начало и конец тренировки, подходы).
+
+Запись публикует событие через pg_notify в своей транзакции, так что оно
+уходит только после commit. В каждом воркере EventListener держит
+отдельное соединение с LISTEN и раздаёт события подписчикам своего
+EventBroker — так событие из любого воркера доходит до всех.
+
+У подписчика ограниченная очередь: если клиент не успевает читать,
+поток закрывается событием overflow, и клиент должен перечитать
+состояние и переподключиться. Число подписок ограничено на воркер и на
+дневник.
+
+Тот же слушатель сбрасывает кэши воркера по NOTIFY в канале
+cache_invalidation: {"caches": [имя, ...], "keys": [ключ, ...]}. Так
+изменение, сделанное в одном воркере (или вручную через pg_notify),
+видят все.
+"""
+import json
+import asyncio
+import logging
+from functools import lru_cache
+from datetime import datetime, UTC
+from typing import Any
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi.responses import StreamingResponse
+
+from src.core.cache import TTLCache
+from src.core.config import DBSettings, get_settings
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "diary_events"
+INVALIDATION_CHANNEL = "cache_invalidation"
+RECONNECT_DELAY = 1.0
+HEALTHCHECK_INTERVAL = 30.0
+EVENT_STREAM_MEDIA_TYPE = "text/event-stream"
+# Через сколько миллисекунд EventSource переподключается после обрыва
+SSE_RETRY_MS = 3000
+
+
+async def publish_event(db: AsyncSession, diary_id: int, event_type: str,
+                        **data: Any) -> None:
+    """Ставит событие в очередь NOTIFY текущей транзакции"""
+    payload = json.dumps({
+        "type": event_type,
+        "diary_id": diary_id,
+        "at": datetime.now(UTC).isoformat(),
+        **data,
+    }, default=str)
+    await db.execute(select(func.pg_notify(CHANNEL, payload)))
+
+
+async def publish_invalidation(db: AsyncSession, caches: list[str],
+                               keys: list[Any]) -> None:
+    """Ставит сброс ключей кэшей во всех воркерах в очередь NOTIFY текущей
+    транзакции: до commit никто не перечитает старое значение заново"""
+    payload = json.dumps({"caches": caches, "keys": keys}, default=str)
+    await db.execute(select(func.pg_notify(INVALIDATION_CHANNEL, payload)))
+
+
+class BrokerFull(Exception):
+    pass
+
+
+class Subscription:
+    def __init__(self, diary_id: int, maxsize: int):
+        self.diary_id = diary_id
+        self.queue: asyncio.Queue[dict | None] = asyncio.Queue(maxsize)
+        self.overflowed = False
+
+
+class EventBroker:
+    def __init__(self, max_connections: int, max_per_diary: int,
+                 queue_size: int):
+        self.max_connections = max_connections
+        self.max_per_diary = max_per_diary
+        self.queue_size = queue_size
+        self.count = 0
+        self.overflows = 0
+        self.closed = False
+        self._subscribers: dict[int, set[Subscription]] = {}
+
+    def subscribe(self, diary_id: int) -> Subscription:
+        subscribers = self._subscribers.get(diary_id, set())
+        if (self.closed
+                or self.count >= self.max_connections
+                or len(subscribers) >= self.max_per_diary):
+            raise BrokerFull()
+
+        subscription = Subscription(diary_id, self.queue_size)
+        self._subscribers.setdefault(diary_id, set()).add(subscription)
+        self.count += 1
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscribers = self._subscribers.get(subscription.diary_id)
+        if subscribers is None or subscription not in subscribers:
+            return
+        subscribers.discard(subscription)
+        if not subscribers:
+            del self._subscribers[subscription.diary_id]
+        self.count -= 1
+
+    def _put(self, subscription: Subscription, event: dict | None) -> None:
+        if subscription.overflowed:
+            return
+        try:
+            subscription.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Медленный клиент: не копим события, а закрываем его поток
+            subscription.overflowed = True
+            self.overflows += 1
+
+    def publish(self, diary_id: int, event: dict) -> None:
+        for subscription in tuple(self._subscribers.get(diary_id, ())):
+            self._put(subscription, event)
+
+    def broadcast(self, event: dict) -> None:
+        for subscribers in tuple(self._subscribers.values()):
+            for subscription in tuple(subscribers):
+                self._put(subscription, event)
+
+    def close(self) -> None:
+        """Завершает все потоки и не принимает новые подписки, например
+        при остановке воркера"""
+        self.closed = True
+        for subscribers in tuple(self._subscribers.values()):
+            for subscription in tuple(subscribers):
+                try:
+                    subscription.queue.put_nowait(None)
+                except asyncio.QueueFull:
+                    subscription.overflowed = True
+
+
+@lru_cache()
+def get_event_broker() -> EventBroker:
+    settings = get_settings().EVENTS
+    return EventBroker(settings.EVENTS_MAX_CONNECTIONS,
+                       settings.EVENTS_MAX_PER_DIARY,
+                       settings.EVENTS_QUEUE_SIZE)
+
+
+def _sse(event: dict) -> bytes:
+    return (f"event: {event['type']}\n"
+            f"data: {json.dumps(event, separators=(',', ':'))}\n\n"
+            ).encode()
+
+
+async def _iter_sse(subscription: Subscription, heartbeat: float):
+    yield f"retry: {SSE_RETRY_MS}\n\n".encode()
+    while True:
+        try:
+            event = await asyncio.wait_for(subscription.queue.get(),
+                                           heartbeat)
+        except TimeoutError:
+            # Комментарий не даёт прокси закрыть простаивающее соединение
+            yield b": ping\n\n"
+            continue
+        if event is None:
+            return
+        yield _sse(event)
+        if subscription.overflowed and subscription.queue.empty():
+            yield _sse({"type": "overflow"})
+            return
+
+
+class EventStreamResponse(StreamingResponse):
+    """SSE-поток подписки; подписка снимается, чем бы ни кончился ответ"""
+
+    def __init__(self, broker: EventBroker, subscription: Subscription,
+                 heartbeat: float):
+        super().__init__(_iter_sse(subscription, heartbeat),
+                         media_type=EVENT_STREAM_MEDIA_TYPE,
+                         headers={"Cache-Control": "no-cache",
+                                  "X-Accel-Buffering": "no"})
+        self.broker = broker
+        self.subscription = subscription
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.broker.unsubscribe(self.subscription)
+
+
+class EventListener:
+    """LISTEN на отдельном соединении asyncpg (мимо пула SQLAlchemy, чтобы
+    не занимать его соединение навсегда) с переподключением. caches —
+    кэши воркера, которые сбрасываются по cache_invalidation"""
+
+    def __init__(self, broker: EventBroker, db: DBSettings,
+                 caches: dict[str, TTLCache] | None = None):
+        self.broker = broker
+        self.db = db
+        self.caches = caches or {}
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(),
+                                             name="diary-events-listener")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _on_notify(self, connection, pid, channel, payload: str) -> None:
+        try:
+            event = json.loads(payload)
+            self.broker.publish(int(event["diary_id"]), event)
+        except (ValueError, KeyError, TypeError):
+            logger.warning("Malformed %s payload: %r", CHANNEL, payload)
+
+    def _on_invalidate(self, connection, pid, channel, payload: str) -> None:
+        try:
+            message = json.loads(payload)
+            caches = [self.caches[name] for name in message["caches"]
+                      if name in self.caches]
+            for key in message["keys"]:
+                for cache in caches:
+                    cache.pop(key)
+        except (ValueError, KeyError, TypeError):
+            logger.warning("Malformed %s payload: %r", INVALIDATION_CHANNEL,
+                           payload)
+
+    async def _run(self) -> None:
+        import asyncpg
+
+        reconnected = False
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(
+                    host=self.db.DB_HOST,
+                    port=self.db.DB_PORT,
+                    user=self.db.DB_USER,
+                    password=self.db.DB_PASS.get_secret_value(),
+                    database=self.db.DB_NAME,
+                )
+                lost = asyncio.Event()
+                connection.add_termination_listener(lambda _: lost.set())
+                await connection.add_listener(CHANNEL, self._on_notify)
+                await connection.add_listener(INVALIDATION_CHANNEL,
+                                              self._on_invalidate)
+                if reconnected:
+                    # Пока соединения не было, события и сбросы кэшей
+                    # могли потеряться
+                    self.broker.broadcast({"type": "resync"})
+                    for cache in self.caches.values():
+                        cache.clear()
+                # Обрыв сети без закрытия сокета сам не обнаружится
+                while not lost.is_set():
+                    try:
+                        await asyncio.wait_for(lost.wait(),
+                                               HEALTHCHECK_INTERVAL)
+                    except TimeoutError:
+                        await connection.execute(
+                            "SELECT 1", timeout=HEALTHCHECK_INTERVAL)
+                logger.warning("%s listener connection lost", CHANNEL)
+            except (OSError, TimeoutError, asyncpg.PostgresError,
+                    asyncpg.InterfaceError) as exc:
+                logger.warning("%s listener: %s", CHANNEL, exc)
+            finally:
+                if connection is not None and not connection.is_closed():
+                    await connection.close()
+            reconnected = True
+            await asyncio.sleep(RECONNECT_DELAY)
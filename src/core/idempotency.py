@@ -0,0 +1,273 @@
+"""Повтор изменяющих запросов по заголовку Idempotency-Key.
+
+Клиент присылает с POST/PUT/PATCH/DELETE уникальный ключ. Первый запрос
+с ключом выполняется как обычно, его ответ сохраняется вместе с
+отпечатком запроса (метод, путь, query, тело). Повтор с тем же ключом
+получает сохранённый ответ, не доходя до роутеров и базы.
+
+Пока первый запрос выполняется, повтор получает 409. Тот же ключ с
+другим запросом — это ошибка клиента, ответ 422. Ответы 5xx и 429 не
+сохраняются, и такой запрос можно повторить с тем же ключом. Ключ
+действует в пределах заголовка Authorization, так что чужой ответ по
+угаданному ключу не получить.
+"""
+import json
+import base64
+import hashlib
+from functools import lru_cache
+from dataclasses import dataclass
+from typing import Any, Protocol
+
+from src.core.cache import TTLCache
+from src.core.config import get_settings
+
+IDEMPOTENCY_HEADER = b"idempotency-key"
+REPLAYED_HEADER = b"idempotent-replayed"
+KEY_MAX_LENGTH = 255
+_METHODS = frozenset({"POST", "PUT", "PATCH", "DELETE"})
+
+
+@dataclass(frozen=True)
+class StoredResponse:
+    status: int
+    headers: list[tuple[bytes, bytes]]
+    body: bytes
+
+
+@dataclass(frozen=True)
+class Entry:
+    fingerprint: str
+    # None — первый запрос ещё выполняется
+    response: StoredResponse | None = None
+
+
+class IdempotencyStore(Protocol):
+    async def reserve(self, key: str, fingerprint: str,
+                      ttl: float) -> Entry | None:
+        """Занимает ключ на ttl секунд. None — ключ наш, иначе уже
+        сохранённая запись"""
+
+    async def save(self, key: str, entry: Entry, ttl: float) -> None: ...
+
+    async def release(self, key: str) -> None: ...
+
+
+class MemoryStore:
+    """Записи в памяти воркера: повтор, попавший в другой воркер, выполнится
+    заново, поэтому при нескольких воркерах validate_settings предупреждает.
+    Между проверкой и записью нет await, так что reserve атомарен"""
+
+    def __init__(self, maxsize: int):
+        self._entries = TTLCache(maxsize, ttl=0, track_stats=False)
+
+    async def reserve(self, key: str, fingerprint: str,
+                      ttl: float) -> Entry | None:
+        entry = self._entries.get(key)
+        if entry is not None:
+            return entry
+        self._entries.set(key, Entry(fingerprint), ttl)
+        return None
+
+    async def save(self, key: str, entry: Entry, ttl: float) -> None:
+        self._entries.set(key, entry, ttl)
+
+    async def release(self, key: str) -> None:
+        self._entries.pop(key)
+
+
+def _dump_entry(entry: Entry) -> str:
+    data: dict[str, Any] = {"fingerprint": entry.fingerprint}
+    if entry.response is not None:
+        data.update(
+            status=entry.response.status,
+            headers=[[name.decode("latin-1"), value.decode("latin-1")]
+                     for name, value in entry.response.headers],
+            body=base64.b64encode(entry.response.body).decode(),
+        )
+    return json.dumps(data)
+
+
+def _load_entry(raw: str | bytes) -> Entry:
+    data = json.loads(raw)
+    response = None
+    if "status" in data:
+        response = StoredResponse(
+            status=data["status"],
+            headers=[(name.encode("latin-1"), value.encode("latin-1"))
+                     for name, value in data["headers"]],
+            body=base64.b64decode(data["body"]),
+        )
+    return Entry(data["fingerprint"], response)
+
+
+class RedisStore:
+    """Записи, общие для всех воркеров. client — redis.asyncio.Redis или
+    подмена с теми же set/get/delete"""
+
+    def __init__(self, client: Any, prefix: str = "idempotency:"):
+        self.client = client
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url: str) -> "RedisStore":
+        try:
+            from redis.asyncio import Redis
+        except ImportError:
+            raise RuntimeError("IDEMPOTENCY_BACKEND=redis требует пакет redis "
+                               "(pip install cofit-api[redis])")
+        return cls(Redis.from_url(url))
+
+    async def reserve(self, key: str, fingerprint: str,
+                      ttl: float) -> Entry | None:
+        # Запись может истечь между SET NX и GET — тогда пробуем ещё раз
+        for _ in range(2):
+            if await self.client.set(self.prefix + key,
+                                     _dump_entry(Entry(fingerprint)),
+                                     nx=True, px=int(ttl * 1000)):
+                return None
+            raw = await self.client.get(self.prefix + key)
+            if raw is not None:
+                return _load_entry(raw)
+        # Ключ так и не занят нами: отвечаем как на выполняющийся запрос,
+        # клиент повторит
+        return Entry(fingerprint)
+
+    async def save(self, key: str, entry: Entry, ttl: float) -> None:
+        await self.client.set(self.prefix + key, _dump_entry(entry),
+                              px=int(ttl * 1000))
+
+    async def release(self, key: str) -> None:
+        await self.client.delete(self.prefix + key)
+
+
+@lru_cache()
+def get_idempotency_store() -> IdempotencyStore:
+    settings = get_settings().IDEMPOTENCY
+    if settings.IDEMPOTENCY_BACKEND == "redis":
+        return RedisStore.from_url(settings.IDEMPOTENCY_REDIS_URL)
+    return MemoryStore(settings.IDEMPOTENCY_KEYS)
+
+
+def _is_cacheable(status: int) -> bool:
+    return status < 500 and status != 429
+
+
+async def _send_json(send, status: int, detail: str,
+                     headers: list[tuple[bytes, bytes]] = ()) -> None:
+    body = json.dumps({"detail": detail}, ensure_ascii=False).encode()
+    await send({"type": "http.response.start",
+                "status": status,
+                "headers": [(b"content-type", b"application/json"),
+                            (b"content-length", str(len(body)).encode()),
+                            *headers]})
+    await send({"type": "http.response.body", "body": body})
+
+
+class IdempotencyMiddleware:
+    """Сохраняет и повторяет ответы на запросы с Idempotency-Key. Стоит
+    внутри остальных middleware, так что повтор проходит через метрики и
+    CORS как обычный запрос"""
+
+    def __init__(self, app, store: IdempotencyStore, ttl: float,
+                 lock_ttl: float, max_body: int):
+        self.app = app
+        self.store = store
+        self.ttl = ttl
+        self.lock_ttl = lock_ttl
+        self.max_body = max_body
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in _METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        key = headers.get(IDEMPOTENCY_HEADER)
+        if key is None:
+            await self.app(scope, receive, send)
+            return
+        if not 0 < len(key) <= KEY_MAX_LENGTH:
+            await _send_json(send, 400, "Некорректный Idempotency-Key")
+            return
+
+        body = bytearray()
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            body += message.get("body", b"")
+            if not message.get("more_body", False):
+                break
+
+        fingerprint = hashlib.sha256(b"\n".join((
+            scope["method"].encode(), scope["path"].encode(),
+            scope["query_string"], bytes(body),
+        ))).hexdigest()
+        store_key = hashlib.sha256(
+            headers.get(b"authorization", b"") + b"\n" + key
+        ).hexdigest()
+
+        entry = await self.store.reserve(store_key, fingerprint,
+                                         self.lock_ttl)
+        if entry is not None:
+            await self._replay(entry, fingerprint, send)
+            return
+
+        body_sent = False
+
+        async def replay_receive():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": bytes(body),
+                        "more_body": False}
+            return await receive()
+
+        status = 500
+        response_headers: list[tuple[bytes, bytes]] = []
+        chunks: list[bytes] = []
+        size = 0
+
+        async def send_wrapper(message):
+            nonlocal status, response_headers, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                response_headers = list(message.get("headers", []))
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+                if size <= self.max_body:
+                    chunks.append(message.get("body", b""))
+            await send(message)
+
+        saved = False
+        try:
+            await self.app(scope, replay_receive, send_wrapper)
+            if _is_cacheable(status) and size <= self.max_body:
+                await self.store.save(
+                    store_key,
+                    Entry(fingerprint, StoredResponse(status,
+                                                      response_headers,
+                                                      b"".join(chunks))),
+                    self.ttl,
+                )
+                saved = True
+        finally:
+            if not saved:
+                await self.store.release(store_key)
+
+    async def _replay(self, entry: Entry, fingerprint: str, send) -> None:
+        if entry.fingerprint != fingerprint:
+            await _send_json(send, 422, "Idempotency-Key уже использован "
+                                        "с другим запросом")
+        elif entry.response is None:
+            await _send_json(send, 409, "Запрос с этим Idempotency-Key "
+                                        "ещё выполняется",
+                             [(b"retry-after", b"1")])
+        else:
+            response = entry.response
+            await send({"type": "http.response.start",
+                        "status": response.status,
+                        "headers": [*response.headers,
+                                    (REPLAYED_HEADER, b"true")]})
+            await send({"type": "http.response.body",
+                        "body": response.body})
@@ -0,0 +1,43 @@
+import signal
+import asyncio
+import threading
+from contextlib import contextmanager
+from collections.abc import Callable, Iterator
+
+EXIT_SIGNALS = (signal.SIGINT, signal.SIGTERM)
+
+
+@contextmanager
+def on_exit_signal(callback: Callable[[], None]) -> Iterator[None]:
+    """Вызывает callback в цикле событий сразу по SIGINT/SIGTERM, а затем
+    прежний обработчик (uvicorn).
+
+    uvicorn при остановке сначала ждёт, пока закроются все соединения, и
+    только потом отправляет lifespan shutdown. Бесконечные ответы (SSE)
+    нужно завершать раньше — по самому сигналу. Ставится внутри lifespan,
+    когда обработчики uvicorn уже установлены"""
+    if threading.current_thread() is not threading.main_thread():
+        yield
+        return
+
+    loop = asyncio.get_running_loop()
+    previous = {sig: signal.getsignal(sig) for sig in EXIT_SIGNALS}
+
+    def handler(sig, frame):
+        loop.call_soon_threadsafe(callback)
+        original = previous[sig]
+        if callable(original):
+            original(sig, frame)
+        elif original == signal.SIG_DFL:
+            signal.signal(sig, signal.SIG_DFL)
+            signal.raise_signal(sig)
+
+    for sig in EXIT_SIGNALS:
+        signal.signal(sig, handler)
+    try:
+        yield
+    finally:
+        for sig, original in previous.items():
+            # Обработчики могли смениться, пока работало приложение
+            if signal.getsignal(sig) is handler:
+                signal.signal(sig, original)
@@ -0,0 +1,234 @@
+import logging
+from time import perf_counter
+from threading import Lock
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RequestStats:
+    queries: int = 0
+    db_time: float = 0.0
+    pool_wait: float = 0.0
+    slowest_time: float = 0.0
+    slowest_statement: str | None = None
+
+
+@dataclass
+class RouteStats:
+    requests: int = 0
+    duration: float = 0.0
+    queries: int = 0
+    db_time: float = 0.0
+    pool_wait: float = 0.0
+    slowest_time: float = 0.0
+    over_budget: int = 0
+    statuses: dict[int, int] = field(default_factory=dict)
+
+
+_current: ContextVar[RequestStats | None] = ContextVar("request_stats",
+                                                       default=None)
+_routes: dict[tuple[str, str], RouteStats] = {}
+_routes_lock = Lock()
+
+
+def record_pool_wait(seconds: float) -> None:
+    stats = _current.get()
+    if stats is not None:
+        stats.pool_wait += seconds
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context,
+                           executemany):
+    conn.info.setdefault("query_started", []).append(perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context,
+                          executemany):
+    started = conn.info["query_started"].pop()
+    stats = _current.get()
+    if stats is None:
+        return
+
+    elapsed = perf_counter() - started
+    stats.queries += 1
+    stats.db_time += elapsed
+    if elapsed > stats.slowest_time:
+        stats.slowest_time = elapsed
+        stats.slowest_statement = statement
+
+
+def _handle_error(exception_context):
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("query_started"):
+        connection.info["query_started"].pop()
+
+
+def instrument_engine(engine: Engine) -> None:
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+def _server_timing(stats: RequestStats, duration: float) -> str:
+    return (
+        f'db;dur={stats.db_time * 1000:.2f};desc="{stats.queries} queries", '
+        f"db-slowest;dur={stats.slowest_time * 1000:.2f}, "
+        f"pool;dur={stats.pool_wait * 1000:.2f}, "
+        f"total;dur={duration * 1000:.2f}"
+    )
+
+
+class MetricsMiddleware:
+    """Собирает по каждому запросу число SQL-запросов, время в базе, самый
+    медленный запрос и ожидание соединения из пула. Отдаёт их в заголовке
+    Server-Timing и копит агрегаты по маршрутам для /metrics."""
+
+    def __init__(self, app, query_budget: int = 0,
+                 server_timing: bool = True):
+        self.app = app
+        self.query_budget = query_budget
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _current.set(stats)
+        started = perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if self.server_timing:
+                    header = _server_timing(stats, perf_counter() - started)
+                    message["headers"] = [
+                        *message.get("headers", []),
+                        (b"server-timing", header.encode("latin-1")),
+                    ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            self._finish(scope, stats, status_code,
+                         perf_counter() - started)
+
+    def _finish(self, scope, stats: RequestStats, status_code: int,
+                duration: float) -> None:
+        route = scope.get("route")
+        path = getattr(route, "path", None) or "<unmatched>"
+        key = (scope["method"], path)
+
+        over_budget = 0 < self.query_budget < stats.queries
+        if over_budget:
+            logger.warning(
+                "%s %s: %d SQL queries (budget %d), db %.1f ms, "
+                "slowest %.1f ms: %s",
+                scope["method"], path, stats.queries, self.query_budget,
+                stats.db_time * 1000, stats.slowest_time * 1000,
+                stats.slowest_statement,
+            )
+
+        with _routes_lock:
+            route_stats = _routes.setdefault(key, RouteStats())
+            route_stats.requests += 1
+            route_stats.duration += duration
+            route_stats.queries += stats.queries
+            route_stats.db_time += stats.db_time
+            route_stats.pool_wait += stats.pool_wait
+            route_stats.slowest_time = max(route_stats.slowest_time,
+                                           stats.slowest_time)
+            route_stats.over_budget += over_budget
+            route_stats.statuses[status_code] = (
+                route_stats.statuses.get(status_code, 0) + 1
+            )
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"')
+
+
+def _labels(**labels) -> str:
+    pairs = (f'{name}="{_escape(value)}"' for name, value in labels.items())
+    return "{" + ",".join(pairs) + "}"
+
+
+_ROUTE_METRICS = (
+    ("cofit_http_request_duration_seconds_total", "counter",
+     "Суммарное время обработки запросов", "duration"),
+    ("cofit_db_queries_total", "counter",
+     "SQL-запросов выполнено", "queries"),
+    ("cofit_db_time_seconds_total", "counter",
+     "Суммарное время SQL-запросов", "db_time"),
+    ("cofit_db_pool_wait_seconds_total", "counter",
+     "Суммарное ожидание соединения из пула", "pool_wait"),
+    ("cofit_db_slowest_query_seconds", "gauge",
+     "Самый медленный SQL-запрос маршрута", "slowest_time"),
+    ("cofit_db_query_budget_exceeded_total", "counter",
+     "Запросов сверх бюджета SQL-запросов", "over_budget"),
+)
+
+
+def render_prometheus(caches: dict | None = None,
+                      pool: dict | None = None) -> str:
+    with _routes_lock:
+        snapshot = {key: RouteStats(**{**vars(stats),
+                                       "statuses": dict(stats.statuses)})
+                    for key, stats in _routes.items()}
+
+    lines = [
+        "# HELP cofit_http_requests_total Обработано HTTP-запросов",
+        "# TYPE cofit_http_requests_total counter",
+    ]
+    for (method, path), stats in sorted(snapshot.items()):
+        for status, count in sorted(stats.statuses.items()):
+            labels = _labels(method=method, route=path, status=status)
+            lines.append(f"cofit_http_requests_total{labels} {count}")
+
+    for name, kind, help_text, attr in _ROUTE_METRICS:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for (method, path), stats in sorted(snapshot.items()):
+            labels = _labels(method=method, route=path)
+            lines.append(f"{name}{labels} {getattr(stats, attr)}")
+
+    if caches:
+        for name, kind in (("hits", "counter"), ("misses", "counter"),
+                           ("size", "gauge")):
+            metric = f"cofit_cache_{name}" + ("_total" if kind == "counter"
+                                              else "")
+            lines.append(f"# TYPE {metric} {kind}")
+            for cache_name, cache in sorted(caches.items()):
+                value = cache.stats()[name]
+                lines.append(f"{metric}{_labels(cache=cache_name)} {value}")
+
+    if pool:
+        # pool_stats(): поля primary и вложенные словари других пулов
+        # (replica) — в Prometheus это одна серия с меткой pool
+        pools = {"primary": {name: value for name, value in pool.items()
+                             if not isinstance(value, dict)}}
+        pools.update((pool_name, stats) for pool_name, stats in pool.items()
+                     if isinstance(stats, dict))
+        for name in pools["primary"]:
+            kind = ("counter" if name in ("checkouts", "timeouts",
+                                          "wait_total_seconds") else "gauge")
+            metric = f"cofit_db_pool_{name}"
+            if kind == "counter" and not name.endswith("_seconds"):
+                metric += "_total"
+            lines.append(f"# TYPE {metric} {kind}")
+            for pool_name, stats in pools.items():
+                lines.append(f"{metric}{_labels(pool=pool_name)} "
+                             f"{stats[name]}")
+
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,17 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+
+def encode_cursor(*values) -> str:
+    raw = json.dumps(values, default=str, separators=(",", ":"))
+    return urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> list:
+    padded = cursor + "=" * (-len(cursor) % 4)
+    try:
+        values = json.loads(urlsafe_b64decode(padded.encode()))
+    except (BinasciiError, UnicodeDecodeError, ValueError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list):
+        raise ValueError("Invalid cursor")
+    return values
@@ -0,0 +1,164 @@
+"""Ограничение частоты запросов алгоритмом token bucket.
+
+Лимит записывается как "5/minute": ведро на 5 жетонов, которое
+наполняется со скоростью 5 жетонов в минуту. Состояние вёдер хранится
+либо в памяти воркера (у каждого воркера свои вёдра), либо в общем
+хранилище — Redis или совместимой подмене с методом eval, например
+fakeredis.
+"""
+from math import ceil
+from time import monotonic
+from threading import Lock
+from functools import lru_cache
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Protocol
+
+from src.core.config import get_settings
+
+_PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+@dataclass(frozen=True)
+class Rate:
+    count: int
+    period: float
+
+    @property
+    def per_second(self) -> float:
+        return self.count / self.period
+
+
+def parse_rate(value: str) -> Rate | None:
+    """"5/minute" -> Rate(5, 60); пустая строка — без лимита"""
+    if not value.strip():
+        return None
+    try:
+        count, period = value.split("/")
+        rate = Rate(int(count), _PERIODS[period.strip().rstrip("s")])
+    except (KeyError, ValueError):
+        raise ValueError(f"Некорректный лимит {value!r}, "
+                         f"ожидается вида '5/minute'")
+    if rate.count < 1:
+        raise ValueError(f"Некорректный лимит {value!r}")
+    return rate
+
+
+class RateLimitBackend(Protocol):
+    async def take(self, key: str, rate: Rate) -> float:
+        """Забирает жетон. 0 — запрос пропускается, иначе через сколько
+        секунд в ведре появится жетон"""
+
+
+class MemoryBackend:
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+        self._lock = Lock()
+
+    async def take(self, key: str, rate: Rate) -> float:
+        now = monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (rate.count, now))
+            tokens = min(rate.count,
+                         tokens + (now - updated_at) * rate.per_second)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / rate.per_second
+
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+            return wait
+
+
+# Время берётся у Redis, чтобы часы воркеров не расходились. Ответ строкой:
+# числа из Lua Redis обрезает до целых
+_TAKE_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or burst
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000))
+return tostring(wait)
+"""
+
+
+class RedisBackend:
+    """Общие для всех воркеров вёдра. client — redis.asyncio.Redis или
+    подмена с тем же eval"""
+
+    def __init__(self, client: Any, prefix: str = "ratelimit:"):
+        self.client = client
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url: str) -> "RedisBackend":
+        try:
+            from redis.asyncio import Redis
+        except ImportError:
+            raise RuntimeError("RATE_LIMIT_BACKEND=redis требует пакет redis "
+                               "(pip install cofit-api[redis])")
+        return cls(Redis.from_url(url))
+
+    async def take(self, key: str, rate: Rate) -> float:
+        wait = await self.client.eval(_TAKE_SCRIPT, 1, self.prefix + key,
+                                      rate.per_second, rate.count)
+        return float(wait)
+
+
+class RateLimited(Exception):
+    def __init__(self, retry_after: float):
+        self.retry_after = retry_after
+
+    @property
+    def retry_after_header(self) -> str:
+        return str(max(1, ceil(self.retry_after)))
+
+
+class RateLimiter:
+    def __init__(self, backend: RateLimitBackend,
+                 limits: dict[str, Rate | None]):
+        self.backend = backend
+        self.limits = limits
+
+    async def check(self, name: str, key: str) -> None:
+        """Бросает RateLimited, если лимит name для key исчерпан"""
+        rate = self.limits.get(name)
+        if rate is None:
+            return
+        wait = await self.backend.take(f"{name}:{key}", rate)
+        if wait > 0:
+            raise RateLimited(wait)
+
+
+@lru_cache()
+def get_rate_limiter() -> RateLimiter:
+    settings = get_settings().RATE_LIMIT
+    if settings.RATE_LIMIT_BACKEND == "redis":
+        backend = RedisBackend.from_url(settings.RATE_LIMIT_REDIS_URL)
+    else:
+        backend = MemoryBackend(settings.RATE_LIMIT_BUCKETS)
+
+    limits = {}
+    if settings.RATE_LIMIT_ENABLED:
+        limits = {
+            "login_ip": parse_rate(settings.RATE_LIMIT_LOGIN_IP),
+            "login_user": parse_rate(settings.RATE_LIMIT_LOGIN_USER),
+            "register_ip": parse_rate(settings.RATE_LIMIT_REGISTER_IP),
+        }
+    return RateLimiter(backend, limits)
@@ -0,0 +1,19 @@
+from typing import Any
+
+from pydantic_core import to_json
+from fastapi import Response
+
+# Компактное представление: вложенные списки — параллельными массивами
+COMPACT_MEDIA_TYPE = "application/vnd.cofit.compact+json"
+
+
+class ModelResponse(Response):
+    """Сериализует уже провалидированные модели сразу в байты.
+
+    Возвращённый из обработчика Response FastAPI не проверяет повторно по
+    response_model, так что модель валидируется один раз.
+    """
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return to_json(content)
@@ -1,41 +1,132 @@
+import time
+import asyncio
+from threading import Lock
+from functools import lru_cache
 from datetime import datetime, timedelta, UTC
+from concurrent.futures import ThreadPoolExecutor
 
-from jose import JWTError, jwt
-from passlib.context import CryptContext
+from src.core.cache import TTLCache
+from src.core.config import get_settings
 
-from src.core.config import settings
+# jose (с cryptography) и passlib импортируются при первом использовании,
+# чтобы импорт модуля не тянул их в alembic и утилиты.
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+@lru_cache()
+def _pwd_context():
+    from passlib.context import CryptContext
+
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+@lru_cache()
+def _signing_key() -> tuple[str, str]:
+    settings = get_settings()
+    return (settings.SECURE.SECRET_KEY.get_secret_value(),
+            settings.SECURE.HASH_ALGORITHM)
+
+@lru_cache()
+def get_token_cache() -> TTLCache:
+    settings = get_settings()
+    return TTLCache(settings.SECURE.TOKEN_CACHE_SIZE,
+                    settings.SECURE.TOKEN_CACHE_TTL,
+                    settings.CACHE.CACHE_STATS)
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    return _pwd_context().hash(password)
 
 def verify_password(plain: str, hashed: str) -> bool:
-    return pwd_context.verify(plain, hashed)
+    return _pwd_context().verify(plain, hashed)
+
+class PasswordHasherBusy(Exception):
+    pass
+
+@lru_cache()
+def _hash_executor() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(
+        max_workers=get_settings().SECURE.HASH_WORKERS,
+        thread_name_prefix="bcrypt",
+    )
+
+_hash_pending = 0
+_hash_pending_lock = Lock()
+
+def _release_hash_slot(_future) -> None:
+    global _hash_pending
+    with _hash_pending_lock:
+        _hash_pending -= 1
+
+async def _run_in_hash_pool(func, *args):
+    global _hash_pending
+    secure = get_settings().SECURE
+    with _hash_pending_lock:
+        if _hash_pending >= secure.HASH_WORKERS + secure.HASH_QUEUE_LIMIT:
+            raise PasswordHasherBusy()
+        _hash_pending += 1
+
+    try:
+        future = _hash_executor().submit(func, *args)
+    except BaseException:
+        _release_hash_slot(None)
+        raise
+    # Слот освобождается, когда bcrypt действительно закончил (или задача
+    # отменена до старта), а не когда запрос отменили: поток продолжает
+    # считать и после обрыва соединения
+    future.add_done_callback(_release_hash_slot)
+    return await asyncio.wrap_future(future)
+
+async def get_password_hash_async(password: str) -> str:
+    return await _run_in_hash_pool(get_password_hash, password)
+
+async def verify_password_async(plain: str, hashed: str) -> bool:
+    return await _run_in_hash_pool(verify_password, plain, hashed)
+
+def shutdown_hash_pool() -> None:
+    if _hash_executor.cache_info().currsize:
+        _hash_executor().shutdown(wait=False, cancel_futures=True)
+        _hash_executor.cache_clear()
 
 def create_access_token(
     data: dict,
     expires_delta: timedelta | None = None
 ) -> str:
+    from jose import jwt
+
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.now(UTC) + expires_delta
     else:
         expire = datetime.now(UTC) + timedelta(
-            days=settings.SECURE.TOKEN_LIFETIME_DAYS
+            days=get_settings().SECURE.TOKEN_LIFETIME_DAYS
         )
     to_encode.update({"exp": expire})
 
-    return jwt.encode(
-        to_encode,
-        settings.SECURE.SECRET_KEY.get_secret_value(),
-        algorithm=settings.SECURE.HASH_ALGORITHM
-    )
+    secret_key, algorithm = _signing_key()
+    return jwt.encode(to_encode, secret_key, algorithm=algorithm)
 
 def decode_token(token: str) -> dict:
+    token_cache = get_token_cache()
+    claims = token_cache.get(token)
+    if claims is not None:
+        if claims.get("exp", float("inf")) > time.time():
+            return claims
+        token_cache.pop(token)
+        return {}
+
+    from jose import JWTError, jwt
+
+    secret_key, algorithm = _signing_key()
     try:
-        return jwt.decode(token,
-                          settings.SECURE.SECRET_KEY.get_secret_value(),
-                          algorithms=[settings.SECURE.HASH_ALGORITHM])
+        claims = jwt.decode(token, secret_key, algorithms=[algorithm])
     except JWTError:
-        return {}
\ No newline at end of file
+        return {}
+
+    ttl = get_settings().SECURE.TOKEN_CACHE_TTL
+    if "exp" in claims:
+        ttl = min(ttl, claims["exp"] - time.time())
+    if ttl > 0:
+        token_cache.set(token, claims, ttl=ttl)
+    return claims
+
+async def warm_up() -> None:
+    """Загружает бэкенды jose и bcrypt до первого логина"""
+    decode_token(create_access_token({"sub": "0"}, timedelta(seconds=1)))
+    await get_password_hash_async("warm-up")
@@ -0,0 +1,64 @@
+from typing import Any, AsyncIterable, AsyncIterator
+
+from pydantic import TypeAdapter
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+CHUNK_SIZE = 64 * 1024
+
+
+def wants_ndjson(request: Request) -> bool:
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+async def _encode(
+    rows: AsyncIterable[Any],
+    adapter: TypeAdapter,
+    prefix: bytes,
+    separator: bytes,
+    terminator: bytes,
+    suffix: bytes,
+) -> AsyncIterator[bytes]:
+    buffer = bytearray(prefix)
+    first = True
+    async for row in rows:
+        if not first:
+            buffer += separator
+        first = False
+        item = adapter.validate_python(row, from_attributes=True)
+        buffer += adapter.dump_json(item)
+        buffer += terminator
+        if len(buffer) >= CHUNK_SIZE:
+            yield bytes(buffer)
+            buffer.clear()
+    buffer += suffix
+    if buffer:
+        yield bytes(buffer)
+
+
+def iter_json_array(rows: AsyncIterable[Any],
+                    adapter: TypeAdapter) -> AsyncIterator[bytes]:
+    return _encode(rows, adapter, b"[", b",", b"", b"]")
+
+
+def iter_ndjson(rows: AsyncIterable[Any],
+                adapter: TypeAdapter) -> AsyncIterator[bytes]:
+    return _encode(rows, adapter, b"", b"", b"\n", b"")
+
+
+def stream_response(request: Request,
+                    rows: AsyncIterable[Any],
+                    adapter: TypeAdapter,
+                    media_type: str = "application/json") -> StreamingResponse:
+    """JSON-массив (с типом media_type) или NDJSON по Accept, собираемый по
+    мере чтения курсора"""
+    # Формат зависит от Accept — кэши должны это учитывать
+    headers = {"Vary": "Accept"}
+    if wants_ndjson(request):
+        return StreamingResponse(iter_ndjson(rows, adapter),
+                                 media_type=NDJSON_MEDIA_TYPE,
+                                 headers=headers)
+    return StreamingResponse(iter_json_array(rows, adapter),
+                             media_type=media_type,
+                             headers=headers)
@@ -1,24 +1,219 @@
-from typing import Any, AsyncGenerator
+import asyncio
+from uuid import uuid4
+from time import perf_counter
+from functools import lru_cache
+from typing import Any, AsyncGenerator, Hashable
 
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from sqlalchemy.ext.asyncio import (create_async_engine,
                                     async_sessionmaker,
+                                    AsyncEngine,
                                     AsyncSession)
-from src.core.config import settings
-
-engine = create_async_engine(
-    settings.DB.get_async_url(),
-    echo=settings.ENVIRONMENT == "development",
-    future=True,
-    pool_size=settings.DB.DB_POOL_SIZE,
-    max_overflow=settings.DB.DB_MAX_OVERFLOW,
-)
-
-AsyncSessionLocal = async_sessionmaker(
-    engine,
-    class_=AsyncSession,
-    expire_on_commit=False,
-)
+from src.core.cache import TTLCache
+from src.core.config import get_settings
+from src.core.metrics import instrument_engine, record_pool_wait
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Пул, который учитывает время ожидания соединения в метриках запроса"""
+
+    checkouts = 0
+    timeouts = 0
+    wait_total = 0.0
+    wait_max = 0.0
+
+    def _do_get(self):
+        started = perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            waited = perf_counter() - started
+            self.checkouts += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+            record_pool_wait(waited)
+
+
+def _connect_args(statement_cache_size: int) -> dict[str, Any]:
+    """Кэши подготовленных выражений: asyncpg и свой у диалекта SQLAlchemy.
+    0 выключает оба, а имена выражений делает уникальными: за pgbouncer
+    в режиме transaction соседний запрос может попасть на серверное
+    соединение, где имя __asyncpg_stmt_N__ уже занято"""
+    connect_args: dict[str, Any] = {
+        "statement_cache_size": statement_cache_size,
+        "prepared_statement_cache_size": statement_cache_size,
+    }
+    if statement_cache_size == 0:
+        connect_args["prepared_statement_name_func"] = (
+            lambda: f"__asyncpg_{uuid4()}__")
+    return connect_args
+
+
+def _create_engine(url: str) -> AsyncEngine:
+    settings = get_settings()
+    created = create_async_engine(
+        url,
+        echo=settings.DB.DB_ECHO,
+        future=True,
+        poolclass=TimedQueuePool,
+        pool_size=settings.DB.DB_POOL_SIZE,
+        max_overflow=settings.DB.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB.DB_POOL_PRE_PING,
+        connect_args=_connect_args(settings.DB.DB_STATEMENT_CACHE_SIZE),
+    )
+    if settings.METRICS.METRICS_ENABLED:
+        instrument_engine(created.sync_engine)
+    return created
+
+
+@lru_cache()
+def get_engine() -> AsyncEngine:
+    return _create_engine(get_settings().DB.get_async_url())
+
+
+@lru_cache()
+def get_read_engine() -> AsyncEngine:
+    replica_url = get_settings().DB.get_replica_async_url()
+    return _create_engine(replica_url) if replica_url else get_engine()
+
+
+def has_replica() -> bool:
+    return get_read_engine() is not get_engine()
+
+
+@lru_cache()
+def get_sessionmaker() -> async_sessionmaker[AsyncSession]:
+    return async_sessionmaker(
+        get_engine(),
+        class_=AsyncSession,
+        expire_on_commit=False,
+    )
+
+
+@lru_cache()
+def get_read_sessionmaker() -> async_sessionmaker[AsyncSession]:
+    return async_sessionmaker(
+        get_read_engine(),
+        class_=AsyncSession,
+        expire_on_commit=False,
+    )
+
+
+class MemoryPins:
+    """Отметки в памяти воркера — только для одного воркера: запрос после
+    записи может попасть в другой"""
+
+    def __init__(self, ttl: float):
+        self._pins = TTLCache(maxsize=100_000, ttl=ttl, track_stats=False)
+
+    async def pin(self, key: Hashable) -> None:
+        self._pins.set(key, True)
+
+    async def is_pinned(self, key: Hashable) -> bool:
+        return self._pins.get(key, False)
+
+
+class RedisPins:
+    """Отметки, общие для всех воркеров. client — redis.asyncio.Redis или
+    подмена с теми же set/exists"""
+
+    def __init__(self, client: Any, ttl: float,
+                 prefix: str = "primary-pin:"):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url: str, ttl: float) -> "RedisPins":
+        try:
+            from redis.asyncio import Redis
+        except ImportError:
+            raise RuntimeError("DB_REPLICA_PIN_BACKEND=redis требует "
+                               "пакет redis (pip install cofit-api[redis])")
+        return cls(Redis.from_url(url), ttl)
+
+    async def pin(self, key: Hashable) -> None:
+        await self.client.set(f"{self.prefix}{key}", 1,
+                              px=int(self.ttl * 1000))
+
+    async def is_pinned(self, key: Hashable) -> bool:
+        return bool(await self.client.exists(f"{self.prefix}{key}"))
+
+
+@lru_cache()
+def _primary_pins() -> MemoryPins | RedisPins:
+    settings = get_settings().DB
+    if settings.DB_REPLICA_PIN_BACKEND == "redis":
+        return RedisPins.from_url(settings.DB_REPLICA_PIN_REDIS_URL,
+                                  settings.DB_REPLICA_PIN_SECONDS)
+    return MemoryPins(settings.DB_REPLICA_PIN_SECONDS)
+
+
+async def pin_to_primary(key: Hashable) -> None:
+    """После записи читаем этого пользователя с primary, пока реплика
+    не догонит (read-your-writes)"""
+    if has_replica():
+        await _primary_pins().pin(key)
+
+
+async def is_pinned_to_primary(key: Hashable) -> bool:
+    if not has_replica():
+        return False
+    return await _primary_pins().is_pinned(key)
 
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
-    async with AsyncSessionLocal() as session:
-        yield session
\ No newline at end of file
+    async with get_sessionmaker()() as session:
+        yield session
+
+
+async def get_read_db() -> AsyncGenerator[AsyncSession, None]:
+    async with get_read_sessionmaker()() as session:
+        yield session
+
+
+async def dispose_engines() -> None:
+    if get_engine.cache_info().currsize:
+        await get_engine().dispose()
+    if get_read_engine.cache_info().currsize and has_replica():
+        await get_read_engine().dispose()
+
+
+def _pool_stats(pool: TimedQueuePool) -> dict[str, Any]:
+    return {
+        "size": pool.size(),
+        "max_overflow": get_settings().DB.DB_MAX_OVERFLOW,
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": max(pool.overflow(), 0),
+        "checkouts": pool.checkouts,
+        "timeouts": pool.timeouts,
+        "wait_total_seconds": round(pool.wait_total, 6),
+        "wait_max_seconds": round(pool.wait_max, 6),
+    }
+
+
+def pool_stats() -> dict[str, Any]:
+    stats = _pool_stats(get_engine().pool)
+    if has_replica():
+        stats["replica"] = _pool_stats(get_read_engine().pool)
+    return stats
+
+
+async def warm_up_pool() -> int:
+    """Открывает pool_size соединений заранее, чтобы первые запросы после
+    деплоя не платили за установку соединений"""
+    engines = {get_engine(), get_read_engine()}
+    connections = await asyncio.gather(
+        *(target.connect()
+          for target in engines
+          for _ in range(target.pool.size()))
+    )
+    for connection in connections:
+        await connection.close()
+    return len(connections)
@@ -0,0 +1,122 @@
+"""Недельные сводки дневника: training_week_stats и exercise_week_stats.
+
+Сводки затронутых недель пересчитываются в той же транзакции, что и запись
+тренировки. Неделя — это несколько тренировок, так что стоимость не растёт
+с длиной истории, а ошибкам накопления взяться неоткуда. Заполнить сводки
+по уже существующей истории:
+
+    python -m src.db.stats
+"""
+from datetime import date, timedelta
+from collections.abc import Iterable
+
+from sqlalchemy import (Date,
+                        DateTime,
+                        Integer,
+                        and_,
+                        cast,
+                        delete,
+                        distinct,
+                        extract,
+                        func,
+                        insert,
+                        literal_column,
+                        select)
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models.stats import ExerciseWeekStats, TrainingWeekStats
+from src.models.training import Training, TrainingExercise
+
+# Первый ключ pg_advisory_xact_lock(int, int): пересчёты одного дневника
+# идут по очереди, иначе параллельная транзакция могла бы записать сводку
+# по снимку без чужой тренировки
+_STATS_LOCK = 18
+
+_week = cast(func.date_trunc(literal_column("'week'"),
+                             cast(Training.date, DateTime)), Date)
+_completed = and_(Training.start_at.is_not(None), Training.end_at.is_not(None))
+_duration = extract("epoch", Training.end_at - Training.start_at)
+
+
+def week_start(day: date) -> date:
+    return day - timedelta(days=day.weekday())
+
+
+async def _insert_stats(db: AsyncSession, *criteria) -> None:
+    await db.execute(
+        insert(TrainingWeekStats).from_select(
+            ("diary_id", "week_start", "trainings", "completed",
+             "duration_seconds"),
+            select(
+                Training.diary_id,
+                _week,
+                func.count(),
+                func.count().filter(_completed),
+                cast(func.round(func.coalesce(
+                    func.sum(_duration).filter(_completed), 0)), Integer),
+            )
+            .where(*criteria)
+            .group_by(Training.diary_id, _week),
+        )
+    )
+    await db.execute(
+        insert(ExerciseWeekStats).from_select(
+            ("diary_id", "week_start", "exercise_id", "trainings", "sets",
+             "volume"),
+            select(
+                Training.diary_id,
+                _week,
+                TrainingExercise.exercise_id,
+                func.count(distinct(Training.id)),
+                func.sum(TrainingExercise.sets_count),
+                func.coalesce(func.sum(TrainingExercise.sets_count
+                                       * TrainingExercise.weight), 0),
+            )
+            .join(TrainingExercise,
+                  TrainingExercise.training_id == Training.id)
+            .where(_completed, *criteria)
+            .group_by(Training.diary_id, _week, TrainingExercise.exercise_id),
+        )
+    )
+
+
+async def refresh_week_stats(db: AsyncSession, diary_id: int,
+                             days: Iterable[date]) -> None:
+    """Пересчитывает сводки недель, в которые попадают days. Вызывать до
+    commit, после изменения тренировок"""
+    weeks = sorted({week_start(day) for day in days})
+    if not weeks:
+        return
+
+    await db.execute(select(func.pg_advisory_xact_lock(_STATS_LOCK,
+                                                       diary_id)))
+    for model in (TrainingWeekStats, ExerciseWeekStats):
+        await db.execute(delete(model).where(model.diary_id == diary_id,
+                                             model.week_start.in_(weeks)))
+    await _insert_stats(
+        db,
+        Training.diary_id == diary_id,
+        Training.date.between(weeks[0], weeks[-1] + timedelta(days=6)),
+        _week.in_(weeks),
+    )
+
+
+async def rebuild_week_stats(db: AsyncSession) -> None:
+    """Полный пересчёт сводок всех дневников"""
+    for model in (TrainingWeekStats, ExerciseWeekStats):
+        await db.execute(delete(model))
+    await _insert_stats(db)
+
+
+if __name__ == "__main__":
+    import asyncio
+
+    from src.db.session import get_engine, get_sessionmaker
+
+    async def main() -> None:
+        async with get_sessionmaker()() as db:
+            await rebuild_week_stats(db)
+            await db.commit()
+        await get_engine().dispose()
+
+    asyncio.run(main())
@@ -1,17 +1,71 @@
+from functools import lru_cache
+from typing import AsyncGenerator
+
 from sqlalchemy import select
 from fastapi import Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi.security import OAuth2PasswordBearer
 
 from src.models.user import User
-from src.db.session import get_db
+from src.models.diary import Diary
+from src.db.session import (get_read_db,
+                            get_read_sessionmaker,
+                            get_sessionmaker,
+                            has_replica,
+                            is_pinned_to_primary)
+from src.core.cache import TTLCache
+from src.core.config import get_settings
+from src.core.events import publish_invalidation
 from src.core.security import decode_token
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
+
+def _user_scoped_cache() -> TTLCache:
+    settings = get_settings()
+    return TTLCache(settings.CACHE.USER_CACHE_SIZE,
+                    settings.CACHE.USER_CACHE_TTL,
+                    settings.CACHE.CACHE_STATS)
+
+
+@lru_cache()
+def get_user_cache() -> TTLCache:
+    return _user_scoped_cache()
+
+
+@lru_cache()
+def get_diary_id_cache() -> TTLCache:
+    return _user_scoped_cache()
+
+
+def user_caches() -> dict[str, TTLCache]:
+    """Кэши по id пользователя под именами для метрик и
+    cache_invalidation. Пользователей API не меняет; после правки в базе
+    запись сбрасывается во всех воркерах так:
+    SELECT pg_notify('cache_invalidation',
+                     '{"caches": ["user", "diary_id"], "keys": [42]}')"""
+    return {"user": get_user_cache(), "diary_id": get_diary_id_cache()}
+
+
+async def invalidate_diary(db: AsyncSession, *user_ids: int | None) -> None:
+    """Сбрасывает id дневника пользователей в этом воркере сразу, а в
+    остальных — по NOTIFY, который уходит с commit транзакции db. Вызывать
+    до commit"""
+    user_ids = [user_id for user_id in user_ids if user_id is not None]
+    for user_id in user_ids:
+        get_diary_id_cache().pop(user_id)
+    if user_ids:
+        await publish_invalidation(db, ["diary_id"], user_ids)
+
+
+async def _find_user(db: AsyncSession, user_id: int) -> User | None:
+    result = await db.execute(select(User).where(User.id == user_id))
+    return result.scalar_one_or_none()
+
+
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ) -> dict:
     payload = decode_token(token)
     user_id = payload.get("sub")
@@ -23,16 +77,58 @@ async def get_current_user(
     except ValueError:
         raise HTTPException(status_code=401, detail="Invalid token payload")
 
-    result = await db.execute(select(User).where(User.id == user_id_int))
-    user = result.scalar_one_or_none()
+    user_cache = get_user_cache()
+    cached = user_cache.get(user_id_int)
+    if cached is not None:
+        return cached
+
+    user = await _find_user(db, user_id_int)
+    if not user and has_replica():
+        # Только что зарегистрированный пользователь мог не доехать до реплики
+        async with get_sessionmaker()() as primary:
+            user = await _find_user(primary, user_id_int)
 
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
 
-    return {
+    current_user = {
         "id": user.id,
         "email": user.email,
         "first_name": user.first_name,
         "second_name": user.second_name,
         "role": user.role,
-    }
\ No newline at end of file
+    }
+    user_cache.set(user_id_int, current_user)
+    return current_user
+
+
+async def get_user_read_db(
+    current_user: dict = Depends(get_current_user),
+) -> AsyncGenerator[AsyncSession, None]:
+    """Сессия для чтения: реплика, но primary сразу после записей
+    пользователя"""
+    factory = (get_sessionmaker()
+               if await is_pinned_to_primary(current_user["id"])
+               else get_read_sessionmaker())
+    async with factory() as session:
+        yield session
+
+
+async def get_my_diary_id(user: dict, db: AsyncSession) -> int:
+    diary_id_cache = get_diary_id_cache()
+    diary_id = diary_id_cache.get(user["id"])
+    if diary_id is not None:
+        return diary_id
+
+    stmt = select(Diary.id).where(
+        Diary.trainer_id == user["id"]
+        if user["role"] == "trainer"
+        else Diary.client_id == user["id"]
+    )
+    result = await db.execute(stmt)
+    diary_id = result.scalar_one_or_none()
+    if diary_id is None:
+        raise HTTPException(status_code=404, detail="Дневник не найден")
+
+    diary_id_cache.set(user["id"], diary_id)
+    return diary_id
@@ -0,0 +1,25 @@
+from fastapi import Depends, Request
+from fastapi.security import OAuth2PasswordRequestForm
+
+from src.core.ratelimit import get_rate_limiter
+
+# Проверки идут в dependencies маршрута, до get_db и обработчика:
+# отклонённая попытка не стоит ни запроса к базе, ни bcrypt.
+
+
+def client_ip(request: Request) -> str:
+    # За прокси uvicorn с proxy_headers подставляет адрес из X-Forwarded-For
+    return request.client.host if request.client else "unknown"
+
+
+async def limit_login(
+    request: Request,
+    form: OAuth2PasswordRequestForm = Depends(),
+) -> None:
+    limiter = get_rate_limiter()
+    await limiter.check("login_ip", client_ip(request))
+    await limiter.check("login_user", form.username.strip().lower())
+
+
+async def limit_register(request: Request) -> None:
+    await get_rate_limiter().check("register_ip", client_ip(request))
@@ -1,34 +1,155 @@
+import logging
+from time import perf_counter
+from typing import TYPE_CHECKING
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
+if TYPE_CHECKING:
+    from fastapi import FastAPI
 
-from src.db.base import Base
-from src.db.session import engine
-from src.routers import auth, diary, exercises, trainings, users
+logger = logging.getLogger("uvicorn.error")
 
-app = FastAPI()
+# Тяжёлые зависимости (FastAPI, SQLAlchemy, asyncpg, passlib, jose) и роутеры
+# импортируются внутри create_app/lifespan: `import src.main` остаётся
+# дешёвым, а движок и настройки создаются только когда реально нужны.
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+@asynccontextmanager
+async def lifespan(app: "FastAPI"):
+    from src.db.base import Base
+    from src.db.session import dispose_engines, get_engine, warm_up_pool
+    from src.core import security
+    from src.core.config import get_settings, validate_settings
+    from src.core.events import EventListener, get_event_broker
+    from src.core.lifecycle import on_exit_signal
+    from src.dependencies.auth import user_caches
+    from src.routers import exercises
 
-app.include_router(auth.router)
-app.include_router(diary.router)
-app.include_router(exercises.router)
-app.include_router(trainings.router)
-app.include_router(users.router)
+    started = perf_counter()
+    settings = get_settings()
+    for warning in validate_settings(settings):
+        logger.warning("Настройки: %s", warning)
+
+    if settings.ENVIRONMENT == "development" and settings.DB.DB_CREATE_ALL:
+        async with get_engine().begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+    if settings.DB.DB_POOL_WARMUP:
+        await warm_up_pool()
+    await security.warm_up()
+    await exercises.warm_up_exercise_cache()
+    broker = get_event_broker()
+    listener = EventListener(broker, settings.DB, caches=user_caches())
+    listener.start()
+    logger.info("Startup finished in %.1f ms",
+                (perf_counter() - started) * 1000)
+
+    # SSE-потоки бесконечны: uvicorn ждёт закрытия соединений до lifespan
+    # shutdown, поэтому потоки завершаются уже по сигналу остановки
+    with on_exit_signal(broker.close):
+        yield
+
+    # Сюда uvicorn доходит, когда запросы уже завершены (или отменены по
+    # timeout_graceful_shutdown): остаётся освободить ресурсы
+    broker.close()
+    await listener.stop()
+    security.shutdown_hash_pool()
+    await dispose_engines()
+
+
+def create_app() -> "FastAPI":
+    from fastapi import FastAPI, Request
+    from fastapi.responses import JSONResponse
+    from fastapi.middleware.cors import CORSMiddleware
+
+    from src.core.config import get_settings
+    from src.core.metrics import MetricsMiddleware
+    from src.core.security import PasswordHasherBusy
+    from src.core.ratelimit import RateLimited, get_rate_limiter
+    from src.core.compression import CompressionMiddleware, make_encoders
+    from src.core.idempotency import (IdempotencyMiddleware,
+                                      get_idempotency_store)
+    from src.routers import auth, diary, exercises, metrics, trainings, users
+
+    settings = get_settings()
+    # Некорректные лимиты в настройках должны ронять старт, а не запрос
+    get_rate_limiter()
+    compression = settings.COMPRESSION
+    encoders = make_encoders(
+        compression.get_encodings(),
+        gzip_level=compression.COMPRESSION_GZIP_LEVEL,
+        brotli_quality=compression.COMPRESSION_BROTLI_QUALITY,
+        zstd_level=compression.COMPRESSION_ZSTD_LEVEL,
+    )
+    app = FastAPI(lifespan=lifespan)
+
+    idempotency = settings.IDEMPOTENCY
+    if idempotency.IDEMPOTENCY_ENABLED:
+        # Добавлен первым — самый внутренний: повтор проходит CORS и
+        # метрики как обычный ответ
+        app.add_middleware(
+            IdempotencyMiddleware,
+            store=get_idempotency_store(),
+            ttl=idempotency.IDEMPOTENCY_TTL,
+            lock_ttl=idempotency.IDEMPOTENCY_LOCK_TTL,
+            max_body=idempotency.IDEMPOTENCY_MAX_BODY,
+        )
+
+    if compression.COMPRESSION_ENABLED and encoders:
+        # Внутри метрик: время сжатия входит в total Server-Timing
+        app.add_middleware(
+            CompressionMiddleware,
+            encoders=encoders,
+            minimum_size=compression.COMPRESSION_MINIMUM_SIZE,
+        )
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    if settings.METRICS.METRICS_ENABLED:
+        app.add_middleware(
+            MetricsMiddleware,
+            query_budget=settings.METRICS.METRICS_QUERY_BUDGET,
+            server_timing=settings.METRICS.METRICS_SERVER_TIMING,
+        )
+        app.include_router(metrics.router)
+
+    app.include_router(auth.router)
+    app.include_router(diary.router)
+    app.include_router(exercises.router)
+    app.include_router(trainings.router)
+    app.include_router(users.router)
+
+    @app.exception_handler(PasswordHasherBusy)
+    async def password_hasher_busy_handler(request: Request,
+                                           exc: PasswordHasherBusy):
+        return JSONResponse(status_code=503,
+                            content={"detail": "Сервер перегружен, "
+                                               "повторите позже"},
+                            headers={"Retry-After": "1"})
+
+    @app.exception_handler(RateLimited)
+    async def rate_limited_handler(request: Request, exc: RateLimited):
+        return JSONResponse(status_code=429,
+                            content={"detail": "Слишком много попыток, "
+                                               "повторите позже"},
+                            headers={"Retry-After": exc.retry_after_header})
+
+    return app
+
+
+def __getattr__(name: str):
+    # `uvicorn src.main:app` и `from src.main import app` продолжают работать:
+    # приложение собирается при первом обращении
+    if name == "app":
+        app = globals()["app"] = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-@asynccontextmanager
-async def lifespan():
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-    yield
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run("src.main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
+    uvicorn.run("src.main:create_app", factory=True,
+                host="0.0.0.0", port=8000, reload=True)
@@ -1,11 +1,15 @@
 from .user import User
 from .diary import Diary
-from .training import Training
+from .training import Training, TrainingSet
 from .exercise import Exercise
+from .stats import TrainingWeekStats, ExerciseWeekStats
 
 __all__ = [
     "User",
     "Diary",
     "Training",
+    "TrainingSet",
     "Exercise",
+    "TrainingWeekStats",
+    "ExerciseWeekStats",
 ]
\ No newline at end of file
@@ -1,4 +1,11 @@
-from sqlalchemy import Column, Integer, String, Text, Boolean
+from sqlalchemy import (DDL,
+                        Column,
+                        Integer,
+                        String,
+                        Text,
+                        Boolean,
+                        Index,
+                        event)
 
 from src.db.base import Base
 
@@ -9,4 +16,16 @@ class Exercise(Base):
     name = Column(String(100), nullable=False, index=True)
     description = Column(Text)
     is_weight = Column(Boolean, default=False)
-    is_duration = Column(Boolean, default=False)
\ No newline at end of file
+    is_duration = Column(Boolean, default=False)
+
+    __table_args__ = (
+        # Поиск по подстроке и нечёткий поиск (ILIKE, <%) по названию
+        Index("ix_exercises_name_trgm", "name",
+              postgresql_using="gin",
+              postgresql_ops={"name": "gin_trgm_ops"}),
+    )
+
+
+# Для create_all; в базах под alembic расширение ставит миграция
+event.listen(Exercise.__table__, "before_create",
+             DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
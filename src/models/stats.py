@@ -0,0 +1,31 @@
+from sqlalchemy import Column, Integer, Date, ForeignKey, Numeric
+
+from src.db.base import Base
+
+class TrainingWeekStats(Base):
+    """Сводка по тренировкам дневника за неделю (week_start — понедельник)"""
+    __tablename__ = "training_week_stats"
+
+    diary_id = Column(Integer,
+                      ForeignKey("diarys.id", ondelete="CASCADE"),
+                      primary_key=True)
+    week_start = Column(Date, primary_key=True)
+    trainings = Column(Integer, nullable=False, default=0)
+    completed = Column(Integer, nullable=False, default=0)
+    duration_seconds = Column(Integer, nullable=False, default=0)
+
+
+class ExerciseWeekStats(Base):
+    """Объём по упражнению за неделю, только по завершённым тренировкам"""
+    __tablename__ = "exercise_week_stats"
+
+    diary_id = Column(Integer,
+                      ForeignKey("diarys.id", ondelete="CASCADE"),
+                      primary_key=True)
+    week_start = Column(Date, primary_key=True)
+    exercise_id = Column(Integer,
+                         ForeignKey("exercises.id", ondelete="CASCADE"),
+                         primary_key=True)
+    trainings = Column(Integer, nullable=False, default=0)
+    sets = Column(Integer, nullable=False, default=0)
+    volume = Column(Numeric(14, 2), nullable=False, default=0)
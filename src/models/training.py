@@ -1,4 +1,5 @@
 from sqlalchemy import (Column,
+                        BigInteger,
                         Integer,
                         String,
                         Date,
@@ -6,7 +7,8 @@ from sqlalchemy import (Column,
                         Index,
                         Numeric,
                         TIMESTAMP,
-                        UniqueConstraint)
+                        UniqueConstraint,
+                        func)
 from sqlalchemy.orm import relationship
 
 from src.db.base import Base
@@ -29,7 +31,8 @@ class Training(Base):
         "TrainingExercise",
         back_populates="training",
         cascade="all, delete-orphan",
-        order_by="TrainingExercise.order_index"
+        order_by="TrainingExercise.order_index",
+        lazy="selectin",
     )
 
     __table_args__ = (
@@ -56,3 +59,27 @@ class TrainingExercise(Base):
                          name="uq_training_exercise"),
         Index("ix_training_order", "training_id", "order_index"),
     )
+
+
+class TrainingSet(Base):
+    """Выполненный подход. Пара (training_exercise_id, set_number) — ключ
+    идемпотентности: повторная отправка того же подхода ничего не меняет"""
+    __tablename__ = "training_sets"
+
+    id = Column(BigInteger, primary_key=True)
+    training_exercise_id = Column(Integer,
+                                  ForeignKey("training_exercises.id",
+                                             ondelete="CASCADE"),
+                                  nullable=False)
+    set_number = Column(Integer, nullable=False)
+    reps = Column(Integer, nullable=True)
+    weight = Column(Numeric(6, 2), nullable=True)
+    duration = Column(Integer, nullable=True)
+    completed_at = Column(TIMESTAMP(timezone=True),
+                          nullable=False,
+                          server_default=func.now())
+
+    __table_args__ = (
+        UniqueConstraint("training_exercise_id", "set_number",
+                         name="uq_training_set"),
+    )
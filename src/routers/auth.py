@@ -7,16 +7,19 @@ from fastapi import APIRouter, Depends, HTTPException
 
 from src.models.user import User
 from src.db.session import get_db
-from src.core.security import (get_password_hash,
-                               verify_password,
+from src.core.responses import ModelResponse
+from src.core.security import (get_password_hash_async,
+                               verify_password_async,
                                create_access_token)
 from src.schemas.user import UserCreate, UserOut, Token
+from src.dependencies.ratelimit import limit_login, limit_register
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 @router.post("/register",
              response_model=UserOut,
-             status_code=HTTPStatus.CREATED)
+             status_code=HTTPStatus.CREATED,
+             dependencies=[Depends(limit_register)])
 async def register(user_in: UserCreate, db: AsyncSession = Depends(get_db)):
     result = await db.execute(select(User).where(User.email == user_in.email))
     if result.scalar_one_or_none():
@@ -26,16 +29,19 @@ async def register(user_in: UserCreate, db: AsyncSession = Depends(get_db)):
         first_name=user_in.first_name,
         second_name=user_in.second_name,
         email=str(user_in.email),
-        password_hash=get_password_hash(user_in.password),
+        password_hash=await get_password_hash_async(user_in.password),
         role=user_in.role,
     )
     db.add(user)
     await db.commit()
     await db.refresh(user)
 
-    return UserOut.model_validate(user)
+    return ModelResponse(UserOut.model_validate(user),
+                         status_code=HTTPStatus.CREATED)
 
-@router.post("/login", response_model=Token)
+@router.post("/login",
+             response_model=Token,
+             dependencies=[Depends(limit_login)])
 async def login(
     form: OAuth2PasswordRequestForm = Depends(),
     db: AsyncSession = Depends(get_db)
@@ -43,9 +49,10 @@ async def login(
     result = await db.execute(select(User).where(User.email == form.username))
     user = result.scalar_one_or_none()
 
-    if not user or not verify_password(form.password, user.password_hash):
+    if not user or not await verify_password_async(form.password,
+                                                   user.password_hash):
         raise HTTPException(status_code=401, detail="Incorrect email or password")
 
     access_token = create_access_token({"sub": str(user.id)})
 
-    return Token(access_token=access_token)
+    return ModelResponse(Token(access_token=access_token))
@@ -1,19 +1,33 @@
+from datetime import date, timedelta
+
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import APIRouter, Depends, HTTPException
 
-from src.db.session import get_db
+from src.db.session import get_db, get_read_sessionmaker, pin_to_primary
+from src.db.stats import week_start
+from src.core.config import get_settings
+from src.core.events import BrokerFull, EventStreamResponse, get_event_broker
+from src.core.responses import ModelResponse
 from src.models.diary import Diary
+from src.models.stats import ExerciseWeekStats, TrainingWeekStats
 from src.schemas.diary import DiaryOut, DiaryJoin
-from src.dependencies.auth import get_current_user
+from src.schemas.stats import DiaryStats, ExerciseWeekStatsOut, WeekStatsOut
+from src.dependencies.auth import (get_current_user,
+                                   get_my_diary_id,
+                                   get_user_read_db,
+                                   invalidate_diary,
+                                   oauth2_scheme)
 
 router = APIRouter(prefix="/diary", tags=["diary"])
 
+STATS_WEEKS_DEFAULT = 12
+
 
 @router.get("/", response_model=DiaryOut)
 async def get_my_diary(
     current_user: dict = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_user_read_db),
 ):
     if current_user["role"] == "trainer":
         result = await db.execute(
@@ -28,7 +42,100 @@ async def get_my_diary(
     if not diary:
         raise HTTPException(status_code=404, detail="Дневник не найден")
 
-    return DiaryOut.model_validate(diary)
+    return ModelResponse(DiaryOut.model_validate(diary))
+
+
+@router.get("/stats", response_model=DiaryStats)
+async def get_diary_stats(
+    date_from: date | None = None,
+    date_to: date | None = None,
+    current_user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_user_read_db),
+):
+    """Понедельная статистика дневника из заранее посчитанных сводок: число
+    тренировок, выполнение плана, средняя длительность и объём
+    (подходы × вес) по упражнениям. По умолчанию — последние 12 недель"""
+    diary_id = await get_my_diary_id(current_user, db)
+
+    date_to = week_start(date_to or date.today())
+    date_from = week_start(
+        date_from or date_to - timedelta(weeks=STATS_WEEKS_DEFAULT - 1))
+    if date_from > date_to:
+        raise HTTPException(status_code=400,
+                            detail="date_from позже date_to")
+
+    weeks = (await db.scalars(
+        select(TrainingWeekStats)
+        .where(TrainingWeekStats.diary_id == diary_id,
+               TrainingWeekStats.week_start.between(date_from, date_to))
+        .order_by(TrainingWeekStats.week_start)
+    )).all()
+    exercises = (await db.scalars(
+        select(ExerciseWeekStats)
+        .where(ExerciseWeekStats.diary_id == diary_id,
+               ExerciseWeekStats.week_start.between(date_from, date_to))
+        .order_by(ExerciseWeekStats.week_start,
+                  ExerciseWeekStats.exercise_id)
+    )).all()
+
+    volume_by_week: dict[date, float] = {}
+    for row in exercises:
+        volume_by_week[row.week_start] = (
+            volume_by_week.get(row.week_start, 0.0) + float(row.volume)
+        )
+
+    return ModelResponse(DiaryStats(
+        diary_id=diary_id,
+        date_from=date_from,
+        date_to=date_to,
+        weeks=[
+            WeekStatsOut(
+                week_start=week.week_start,
+                trainings=week.trainings,
+                completed=week.completed,
+                adherence=(week.completed / week.trainings
+                           if week.trainings else 0.0),
+                avg_duration_seconds=(week.duration_seconds / week.completed
+                                      if week.completed else None),
+                volume=volume_by_week.get(week.week_start, 0.0),
+            )
+            for week in weeks
+        ],
+        exercises=[ExerciseWeekStatsOut.model_validate(row)
+                   for row in exercises],
+    ))
+
+
+@router.get("/events")
+async def diary_events(token: str = Depends(oauth2_scheme)):
+    """Server-Sent Events дневника. У каждого события есть type, diary_id
+    и at (время публикации):
+
+    - training.started: training_id, start_at
+    - training.finished: training_id, start_at, end_at
+    - sets.logged: training_id, count — сколько новых подходов записано;
+      сами подходы — GET /trainings/{training_id}/sets
+
+    Событие resync или overflow значит, что часть событий потеряна и
+    состояние нужно перечитать"""
+    # Своя короткая сессия вместо Depends: сессия зависимости жила бы,
+    # а с ней и соединение из пула, до конца многочасового потока
+    async with get_read_sessionmaker()() as db:
+        current_user = await get_current_user(token, db)
+        diary_id = await get_my_diary_id(current_user, db)
+
+    broker = get_event_broker()
+    try:
+        subscription = broker.subscribe(diary_id)
+    except BrokerFull:
+        raise HTTPException(status_code=503,
+                            detail="Слишком много подписок на события",
+                            headers={"Retry-After": "5"})
+
+    return EventStreamResponse(
+        broker, subscription,
+        heartbeat=get_settings().EVENTS.EVENTS_HEARTBEAT_SECONDS,
+    )
 
 
 @router.post("/", response_model=DiaryOut, status_code=201)
@@ -52,10 +159,13 @@ async def create_diary(
         client_id=None,
     )
     db.add(diary)
+    await invalidate_diary(db, current_user["id"])
     await db.commit()
+    await pin_to_primary(current_user["id"])
     await db.refresh(diary)
 
-    return DiaryOut.model_validate(diary)
+    return ModelResponse(DiaryOut.model_validate(diary),
+                         status_code=201)
 
 
 @router.post("/join", response_model=DiaryOut)
@@ -81,9 +191,11 @@ async def join_diary(
         raise HTTPException(status_code=400, detail="Место уже занято")
 
     diary.client_id = current_user["id"]
+    await invalidate_diary(db, current_user["id"])
     await db.commit()
+    await pin_to_primary(current_user["id"])
     await db.refresh(diary)
-    return DiaryOut.model_validate(diary)
+    return ModelResponse(DiaryOut.model_validate(diary))
 
 
 @router.delete("/", status_code=204)
@@ -103,6 +215,8 @@ async def delete_diary(
         raise HTTPException(status_code=404, detail="Дневник не найден")
 
     await db.delete(diary)
+    await invalidate_diary(db, diary.trainer_id, diary.client_id)
     await db.commit()
+    await pin_to_primary(current_user["id"])
 
     return None
\ No newline at end of file
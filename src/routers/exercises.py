@@ -1,28 +1,244 @@
-from sqlalchemy import select
+import asyncio
+from time import monotonic
+from hashlib import blake2b
+from dataclasses import dataclass, field
+
+from sqlalchemy import and_, case, event, func, literal, or_, select
+from pydantic import TypeAdapter
+from sqlalchemy.orm import Session, object_session
 from sqlalchemy.ext.asyncio import AsyncSession
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 
-from src.db.session import get_db
+from src.db.session import get_read_db, get_read_sessionmaker
+from src.core.config import get_settings
+from src.core.pagination import decode_cursor, encode_cursor
+from src.core.responses import ModelResponse
+from src.core.streaming import stream_response
 from src.models.exercise import Exercise
-from src.schemas.exercise import ExerciseOut
+from src.schemas.exercise import ExerciseOut, ExercisePage
 
 router = APIRouter(prefix="/exercises", tags=["exercises"])
 
+STREAM_CHUNK_SIZE = 1000
+SEARCH_PAGE_SIZE_DEFAULT = 20
+SEARCH_PAGE_SIZE_MAX = 100
+SEARCH_QUERY_MAX_LENGTH = 100
+
+_exercise_adapter = TypeAdapter(ExerciseOut)
+_exercise_list_adapter = TypeAdapter(list[ExerciseOut])
+
+
+@dataclass
+class _CachedBody:
+    body: bytes
+    etag: str
+
+
+@dataclass
+class _Catalogue:
+    expires_at: float
+    all: _CachedBody
+    by_id: dict[int, _CachedBody] = field(default_factory=dict)
+
+
+_catalogue: _Catalogue | None = None
+_catalogue_lock = asyncio.Lock()
+
+
+def _cached_body(body: bytes) -> _CachedBody:
+    return _CachedBody(body, f'"{blake2b(body, digest_size=16).hexdigest()}"')
+
+
+_catalogue_generation = 0
+_DIRTY_KEY = "exercises_changed"
+
+
+def invalidate_exercise_cache() -> None:
+    global _catalogue, _catalogue_generation
+    _catalogue = None
+    # Загрузка, начатая до сброса, не должна положить в кэш старые данные
+    _catalogue_generation += 1
+
+
+def _mark_exercises_changed(mapper, connection, target) -> None:
+    # flush ещё не commit: параллельный запрос перечитал бы каталог без
+    # этих изменений и закэшировал его на EXERCISE_CACHE_TTL. Сбрасываем
+    # кэш после commit сессии
+    session = object_session(target)
+    if session is not None:
+        session.info[_DIRTY_KEY] = True
+
+
+def _invalidate_after_commit(session: Session) -> None:
+    if session.info.pop(_DIRTY_KEY, False):
+        invalidate_exercise_cache()
+
+
+for _event in ("after_insert", "after_update", "after_delete"):
+    event.listen(Exercise, _event, _mark_exercises_changed)
+event.listen(Session, "after_commit", _invalidate_after_commit)
+
+
+async def _get_catalogue(db: AsyncSession) -> _Catalogue:
+    global _catalogue
+    catalogue = _catalogue
+    if catalogue is not None and catalogue.expires_at > monotonic():
+        return catalogue
+
+    async with _catalogue_lock:
+        catalogue = _catalogue
+        if catalogue is not None and catalogue.expires_at > monotonic():
+            return catalogue
+
+        generation = _catalogue_generation
+        result = await db.execute(select(Exercise).order_by(Exercise.name))
+        exercises = [ExerciseOut.model_validate(ex)
+                     for ex in result.scalars().all()]
+
+        catalogue = _Catalogue(
+            expires_at=monotonic() + get_settings().CACHE.EXERCISE_CACHE_TTL,
+            all=_cached_body(_exercise_list_adapter.dump_json(exercises)),
+            by_id={ex.id: _cached_body(ex.model_dump_json().encode())
+                   for ex in exercises},
+        )
+        if generation == _catalogue_generation:
+            _catalogue = catalogue
+        return catalogue
+
+
+async def warm_up_exercise_cache() -> None:
+    async with get_read_sessionmaker()() as db:
+        await _get_catalogue(db)
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return "*" in candidates or etag in candidates
+
+
+def _cached_response(request: Request, cached: _CachedBody) -> Response:
+    headers = {
+        "ETag": cached.etag,
+        "Cache-Control": (f"public, max-age="
+                          f"{get_settings().CACHE.EXERCISE_CACHE_MAX_AGE}"),
+    }
+    if _etag_matches(request, cached.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=cached.body,
+                    media_type="application/json",
+                    headers=headers)
+
+
+def _search_statement(q: str | None, is_weight: bool | None,
+                      is_duration: bool | None, cursor: str | None):
+    stmt = select(Exercise)
+    if is_weight is not None:
+        stmt = stmt.where(Exercise.is_weight.is_(is_weight))
+    if is_duration is not None:
+        stmt = stmt.where(Exercise.is_duration.is_(is_duration))
+
+    if q:
+        # Совпадение по началу названия выше нечётких; подстрока и
+        # word_similarity (оператор <%) идут по GIN-индексу pg_trgm
+        rank = case(
+            (Exercise.name.istartswith(q, autoescape=True), literal(1.0)),
+            else_=func.word_similarity(q, Exercise.name),
+        )
+        stmt = stmt.add_columns(rank).where(or_(
+            Exercise.name.icontains(q, autoescape=True),
+            literal(q).op("<%")(Exercise.name),
+        ))
+        order_by, keys = (rank.desc(), Exercise.id), (rank, Exercise.id)
+    else:
+        order_by = keys = (Exercise.name, Exercise.id)
+
+    if cursor is not None:
+        try:
+            cursor_key, cursor_id = decode_cursor(cursor)
+            cursor_key = float(cursor_key) if q else str(cursor_key)
+            cursor_id = int(cursor_id)
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400,
+                                detail="Некорректный курсор")
+        key, id_ = keys
+        after = key < cursor_key if q else key > cursor_key
+        stmt = stmt.where(or_(after,
+                              and_(key == cursor_key, id_ > cursor_id)))
+
+    return stmt.order_by(*order_by)
+
+
+async def _search_exercises(
+    db: AsyncSession,
+    q: str | None,
+    is_weight: bool | None,
+    is_duration: bool | None,
+    cursor: str | None,
+    limit: int,
+) -> ExercisePage:
+    result = await db.execute(
+        _search_statement(q, is_weight, is_duration, cursor).limit(limit + 1)
+    )
+    rows = result.all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last[1] if q else last[0].name,
+                                    last[0].id)
+
+    return ExercisePage(
+        items=[ExerciseOut.model_validate(row[0]) for row in rows],
+        next_cursor=next_cursor,
+    )
+
+
+@router.get("/", response_model=list[ExerciseOut] | ExercisePage)
+async def get_all_exercises(
+    request: Request,
+    q: str | None = Query(None, min_length=1,
+                          max_length=SEARCH_QUERY_MAX_LENGTH),
+    is_weight: bool | None = None,
+    is_duration: bool | None = None,
+    cursor: str | None = None,
+    limit: int | None = Query(None, ge=1, le=SEARCH_PAGE_SIZE_MAX),
+    stream: bool = False,
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Без параметров — весь каталог из кэша с ETag. С q (поиск по названию:
+    сначала по началу, потом нечёткий), фильтрами is_weight/is_duration,
+    cursor или limit — страница ExercisePage"""
+    if any(param is not None
+           for param in (q, is_weight, is_duration, cursor, limit)):
+        return ModelResponse(await _search_exercises(
+            db, q.strip() if q else None, is_weight, is_duration, cursor,
+            limit or SEARCH_PAGE_SIZE_DEFAULT,
+        ))
 
-@router.get("/", response_model=list[ExerciseOut])
-async def get_all_exercises(db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(Exercise).order_by(Exercise.name))
-    exercises = result.scalars().all()
+    if stream:
+        result = await db.stream_scalars(
+            select(Exercise)
+            .order_by(Exercise.name)
+            .execution_options(yield_per=STREAM_CHUNK_SIZE)
+        )
+        return stream_response(request, result, _exercise_adapter)
 
-    return [ExerciseOut.model_validate(ex) for ex in exercises]
+    catalogue = await _get_catalogue(db)
+    return _cached_response(request, catalogue.all)
 
 @router.get("/{exercise_id}", response_model=ExerciseOut)
 async def get_exercise(
     exercise_id: int,
-    db: AsyncSession = Depends(get_db),
+    request: Request,
+    db: AsyncSession = Depends(get_read_db),
 ):
-    exercise = await db.get(Exercise, exercise_id)
-    if not exercise:
+    catalogue = await _get_catalogue(db)
+    cached = catalogue.by_id.get(exercise_id)
+    if not cached:
         raise HTTPException(status_code=404, detail="Упражнение не найдено")
 
-    return ExerciseOut.model_validate(exercise)
\ No newline at end of file
+    return _cached_response(request, cached)
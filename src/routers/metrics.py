@@ -0,0 +1,24 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from src.db.session import pool_stats
+from src.core.metrics import render_prometheus
+from src.core.security import get_token_cache
+from src.dependencies.auth import user_caches
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics", response_class=PlainTextResponse,
+            include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(
+        render_prometheus({**user_caches(), "token": get_token_cache()},
+                          pool_stats()),
+        media_type="text/plain; version=0.0.4",
+    )
+
+
+@router.get("/metrics/pool", include_in_schema=False)
+async def metrics_pool():
+    return pool_stats()
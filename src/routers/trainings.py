@@ -1,51 +1,208 @@
-from sqlalchemy import select
-from datetime import date, datetime
+from typing import Annotated
+from datetime import date
+from sqlalchemy import (TIMESTAMP,
+                        Integer,
+                        Numeric,
+                        and_,
+                        cast,
+                        column,
+                        func,
+                        insert,
+                        or_,
+                        select,
+                        update,
+                        values)
 from sqlalchemy.ext.asyncio import AsyncSession
-from fastapi import APIRouter, Depends, HTTPException
-
-from src.db.session import get_db
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request
+
+from src.db.session import get_db, pin_to_primary
+from src.db.stats import refresh_week_stats
+from src.core.events import publish_event
 from src.models.diary import Diary
 from src.models.exercise import Exercise
-from src.dependencies.auth import get_current_user
-from src.models.training import Training, TrainingExercise
-from src.schemas.training import TrainingCreate, TrainingOut
+from src.dependencies.auth import (get_current_user,
+                                   get_my_diary_id,
+                                   get_user_read_db)
+from src.core.responses import COMPACT_MEDIA_TYPE, ModelResponse
+from src.core.pagination import decode_cursor, encode_cursor
+from src.core.streaming import (NDJSON_MEDIA_TYPE,
+                                iter_ndjson,
+                                stream_response)
+from src.models.training import Training, TrainingExercise, TrainingSet
+from src.schemas.training import (TrainingCompactOut,
+                                  TrainingCompactPage,
+                                  TrainingCreate,
+                                  TrainingOut,
+                                  TrainingPage,
+                                  TrainingSetCreate,
+                                  TrainingSetOut,
+                                  TrainingSetsAppended)
 
 
 router = APIRouter(prefix="/trainings", tags=["trainings"])
 
-
-async def _get_my_diary(user: dict, db: AsyncSession) -> Diary:
-    stmt = select(Diary).where(
-        Diary.trainer_id == user["id"]
-        if user["role"] == "trainer"
-        else Diary.client_id == user["id"]
+PAGE_SIZE_DEFAULT = 50
+PAGE_SIZE_MAX = 200
+BATCH_SIZE_MAX = 500
+STREAM_CHUNK_SIZE = 500
+
+_training_adapter = TypeAdapter(TrainingOut)
+_training_compact_adapter = TypeAdapter(TrainingCompactOut)
+
+_TRAINING_COLUMNS = (Training.id, Training.diary_id, Training.name,
+                     Training.date, Training.start_at, Training.end_at)
+_TRAINING_EXERCISE_COLUMNS = ("training_id", "exercise_id", "order_index",
+                              "sets_count", "set_duration", "weight")
+_TRAINING_SET_COLUMNS = ("set_number", "reps", "weight", "duration")
+
+
+async def _insert_trainings(
+    db: AsyncSession,
+    diary_id: int,
+    payloads: list[TrainingCreate],
+) -> list[TrainingOut]:
+    result = await db.execute(
+        insert(Training).returning(*_TRAINING_COLUMNS,
+                                   sort_by_parameter_order=True),
+        [
+            {"diary_id": diary_id,
+             "name": payload.name,
+             "date": payload.date,
+             "start_at": payload.start_at,
+             "end_at": payload.end_at}
+            for payload in payloads
+        ],
     )
-    result = await db.execute(stmt)
-    diary = result.scalar_one_or_none()
-    if not diary:
-        raise HTTPException(status_code=404, detail="Дневник не найден")
-    return diary
+    trainings = [dict(row, exercises=[]) for row in result.mappings()]
+
+    exercise_rows = [
+        (training["id"], ex.exercise_id, ex.order_index, ex.sets_count,
+         ex.set_duration, ex.weight)
+        for training, payload in zip(trainings, payloads)
+        for ex in payload.exercises
+    ]
+    if exercise_rows:
+        rows = values(
+            column("training_id", Integer),
+            column("exercise_id", Integer),
+            column("order_index", Integer),
+            column("sets_count", Integer),
+            column("set_duration", Integer),
+            column("weight", Numeric(6, 2)),
+            name="payload",
+        ).data(exercise_rows)
+        # JOIN с exercises отбрасывает несуществующие упражнения,
+        # так что проверка наличия идёт тем же запросом, что и вставка.
+        # CAST нужен для столбцов, где во всех строках NULL.
+        result = await db.execute(
+            insert(TrainingExercise)
+            .from_select(
+                _TRAINING_EXERCISE_COLUMNS,
+                select(*(cast(rows.c[name], rows.c[name].type)
+                         for name in _TRAINING_EXERCISE_COLUMNS))
+                .join(Exercise, Exercise.id == rows.c.exercise_id),
+            )
+            .returning(TrainingExercise.id,
+                       *(getattr(TrainingExercise, name)
+                         for name in _TRAINING_EXERCISE_COLUMNS))
+        )
+        exercises = [dict(row) for row in result.mappings()]
 
+        requested_ids = {row[1] for row in exercise_rows}
+        found_ids = {ex["exercise_id"] for ex in exercises}
+        if missing := requested_ids - found_ids:
+            await db.rollback()
+            raise HTTPException(status_code=404,
+                                detail=f"Упражнения не найдены: {missing}")
 
-@router.get("/", response_model=list[TrainingOut])
+        by_training = {training["id"]: training for training in trainings}
+        for ex in sorted(exercises, key=lambda ex: ex["order_index"]):
+            by_training[ex["training_id"]]["exercises"].append(ex)
+
+    await refresh_week_stats(db, diary_id,
+                             (payload.date for payload in payloads))
+    return [TrainingOut.model_validate(training) for training in trainings]
+
+
+@router.get("/", response_model=TrainingPage,
+            responses={200: {"content": {COMPACT_MEDIA_TYPE: {}}}})
 async def get_trainings(
+    request: Request,
     dt: date | None = None,
+    date_from: date | None = None,
+    date_to: date | None = None,
+    cursor: str | None = None,
+    limit: int = Query(PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX),
+    stream: bool = False,
+    compact: bool = False,
     current_user: dict = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_user_read_db),
 ):
-    diary = await _get_my_diary(current_user, db)
+    """С stream=true отдаёт весь диапазон без лимита потоком (JSON-массив
+    или NDJSON по Accept), читая тренировки серверным курсором.
+
+    С compact=true или Accept: application/vnd.cofit.compact+json
+    упражнения каждой тренировки приходят параллельными массивами
+    (TrainingCompactOut) — без повторения ключей на каждое упражнение"""
+    compact = compact or COMPACT_MEDIA_TYPE in request.headers.get("accept",
+                                                                   "")
+    diary_id = await get_my_diary_id(current_user, db)
 
-    stmt = select(Training).where(Training.diary_id == diary.id)
+    stmt = select(Training).where(Training.diary_id == diary_id)
 
     if dt is not None:
         stmt = stmt.where(Training.date == dt)
+    if date_from is not None:
+        stmt = stmt.where(Training.date >= date_from)
+    if date_to is not None:
+        stmt = stmt.where(Training.date <= date_to)
+
+    if cursor is not None:
+        try:
+            cursor_date, cursor_id = decode_cursor(cursor)
+            cursor_date = date.fromisoformat(cursor_date)
+            cursor_id = int(cursor_id)
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400,
+                                detail="Некорректный курсор")
+        stmt = stmt.where(or_(
+            Training.date < cursor_date,
+            and_(Training.date == cursor_date, Training.id > cursor_id),
+        ))
 
     stmt = stmt.order_by(Training.date.desc(), Training.id)
 
-    result = await db.execute(stmt)
+    if stream:
+        result = await db.stream_scalars(
+            stmt.execution_options(yield_per=STREAM_CHUNK_SIZE)
+        )
+        if compact:
+            return stream_response(request, result,
+                                   _training_compact_adapter,
+                                   media_type=COMPACT_MEDIA_TYPE)
+        return stream_response(request, result, _training_adapter)
+
+    result = await db.execute(stmt.limit(limit + 1))
     trainings = result.scalars().all()
 
-    return [TrainingOut.model_validate(t) for t in trainings]
+    next_cursor = None
+    if len(trainings) > limit:
+        trainings = trainings[:limit]
+        last = trainings[-1]
+        next_cursor = encode_cursor(last.date.isoformat(), last.id)
+
+    if compact:
+        return ModelResponse(TrainingCompactPage(
+            items=[TrainingCompactOut.model_validate(t) for t in trainings],
+            next_cursor=next_cursor,
+        ), media_type=COMPACT_MEDIA_TYPE, headers={"Vary": "Accept"})
+    return ModelResponse(TrainingPage(
+        items=[TrainingOut.model_validate(t) for t in trainings],
+        next_cursor=next_cursor,
+    ), headers={"Vary": "Accept"})
 
 
 @router.post("/", response_model=TrainingOut, status_code=201)
@@ -58,48 +215,102 @@ async def create_training(
         raise HTTPException(status_code=403,
                             detail="Только тренер может создавать тренировки")
 
-    diary = await _get_my_diary(current_user, db)
+    diary_id = await get_my_diary_id(current_user, db)
 
-    if payload.diary_id != diary.id:
+    if payload.diary_id != diary_id:
         raise HTTPException(status_code=403,
                             detail="Нельзя создавать"
                                    " тренировку в чужом дневнике")
 
-    if payload.exercises:
-        exercise_ids = [ex.exercise_id for ex in payload.exercises]
-        result = await db.execute(
-            select(Exercise.id).where(Exercise.id.in_(exercise_ids))
-        )
-        found_ids = {row[0] for row in result.fetchall()}
-        if missing := set(exercise_ids) - found_ids:
-            raise HTTPException(status_code=404,
-                                detail=f"Упражнения не найдены: {missing}")
-
-    training = Training(
-        diary_id=diary.id,
-        name=payload.name,
-        date=payload.date,
-        start_at=payload.start_at,
-        end_at=payload.end_at,
-    )
-    db.add(training)
+    [training] = await _insert_trainings(db, diary_id, [payload])
     await db.commit()
-    await db.refresh(training)
-
-    for ex in payload.exercises:
-        te = TrainingExercise(
-            training_id=training.id,
-            exercise_id=ex.exercise_id,
-            order_index=ex.order_index,
-            sets_count=ex.sets_count,
-            set_duration=ex.set_duration,
-            weight=ex.weight,
-        )
-        db.add(te)
+    await pin_to_primary(current_user["id"])
+    return ModelResponse(training, status_code=201)
 
+
+@router.post("/batch", response_model=list[TrainingOut], status_code=201)
+async def create_trainings_batch(
+    payloads: Annotated[list[TrainingCreate],
+                        Body(min_length=1, max_length=BATCH_SIZE_MAX)],
+    current_user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    if current_user["role"] != "trainer":
+        raise HTTPException(status_code=403,
+                            detail="Только тренер может создавать тренировки")
+
+    diary_id = await get_my_diary_id(current_user, db)
+
+    if any(payload.diary_id != diary_id for payload in payloads):
+        raise HTTPException(status_code=403,
+                            detail="Нельзя создавать"
+                                   " тренировку в чужом дневнике")
+
+    trainings = await _insert_trainings(db, diary_id, payloads)
     await db.commit()
-    await db.refresh(training)
-    return TrainingOut.model_validate(training)
+    await pin_to_primary(current_user["id"])
+    return ModelResponse(trainings, status_code=201)
+
+
+@router.get("/export")
+async def export_trainings(
+    current_user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_user_read_db),
+):
+    """Вся история дневника в формате NDJSON, по тренировке на строку"""
+    diary_id = await get_my_diary_id(current_user, db)
+
+    result = await db.stream_scalars(
+        select(Training)
+        .where(Training.diary_id == diary_id)
+        .order_by(Training.date, Training.id)
+        .execution_options(yield_per=STREAM_CHUNK_SIZE)
+    )
+
+    return StreamingResponse(iter_ndjson(result, _training_adapter),
+                             media_type=NDJSON_MEDIA_TYPE)
+
+
+async def _transition(
+    db: AsyncSession,
+    training_id: int,
+    user_id: int,
+    *conditions,
+    **values,
+) -> Training | None:
+    """Переход состояния одним UPDATE ... RETURNING: проверка владельца и
+    состояния идёт в WHERE, так что два одновременных запроса не пройдут
+    оба. None — ни одна строка не подошла"""
+    result = await db.scalars(
+        update(Training)
+        .where(Training.id == training_id,
+               Training.diary_id == (select(Diary.id)
+                                     .where(Diary.client_id == user_id)
+                                     .scalar_subquery()),
+               *conditions)
+        .values(**values)
+        .returning(Training)
+    )
+    return result.one_or_none()
+
+
+async def _training_state(db: AsyncSession, training_id: int,
+                          current_user: dict):
+    """Диагностика после неудачной записи, не на горячем пути: 404/403
+    бросает сама, иначе отдаёт текущее состояние тренировки"""
+    diary_id = await get_my_diary_id(current_user, db)
+    result = await db.execute(
+        select(Training.diary_id, Training.start_at, Training.end_at)
+        .where(Training.id == training_id)
+    )
+    state = result.one_or_none()
+    if state is None:
+        raise HTTPException(status_code=404,
+                            detail="Тренировка не найдена")
+    if state.diary_id != diary_id:
+        raise HTTPException(status_code=403,
+                            detail="Это не ваша тренировка")
+    return state
 
 
 @router.patch("/{training_id}/start", response_model=TrainingOut)
@@ -113,23 +324,25 @@ async def start_training(
         raise HTTPException(status_code=403,
                             detail="Только клиент может начать тренировку")
 
-    diary = await _get_my_diary(current_user, db)
-    training = await db.get(Training, training_id)
+    training = await _transition(db, training_id, current_user["id"],
+                                 Training.start_at.is_(None),
+                                 start_at=func.now())
+    if training is None:
+        state = await _training_state(db, training_id, current_user)
+        if state.start_at is not None:
+            raise HTTPException(status_code=400,
+                                detail="Тренировка уже начата")
+        raise HTTPException(status_code=409,
+                            detail="Тренировка изменилась, повторите запрос")
 
-    if not training:
-        raise HTTPException(status_code=404,
-                            detail="Тренировка не найдена")
-    if training.diary_id != diary.id:
-        raise HTTPException(status_code=403,
-                            detail="Это не ваша тренировка")
-    if training.start_at is not None:
-        raise HTTPException(status_code=400,
-                            detail="Тренировка уже начата")
-
-    training.start_at = datetime.utcnow()
+    if training.end_at is not None:
+        await refresh_week_stats(db, training.diary_id, [training.date])
+    await publish_event(db, training.diary_id, "training.started",
+                        training_id=training.id,
+                        start_at=training.start_at)
     await db.commit()
-    await db.refresh(training)
-    return TrainingOut.model_validate(training)
+    await pin_to_primary(current_user["id"])
+    return ModelResponse(TrainingOut.model_validate(training))
 
 
 @router.patch("/{training_id}/finish", response_model=TrainingOut)
@@ -142,27 +355,142 @@ async def finish_training(
         raise HTTPException(status_code=403,
                             detail="Только клиент может завершить тренировку")
 
-    diary = await _get_my_diary(current_user, db)
-    training = await db.get(Training, training_id)
+    training = await _transition(db, training_id, current_user["id"],
+                                 Training.start_at.is_not(None),
+                                 Training.end_at.is_(None),
+                                 end_at=func.now())
+    if training is None:
+        state = await _training_state(db, training_id, current_user)
+        if state.start_at is None:
+            raise HTTPException(status_code=400,
+                                detail="Тренировка ещё не начата")
+        if state.end_at is not None:
+            raise HTTPException(status_code=400,
+                                detail="Тренировка уже завершена")
+        raise HTTPException(status_code=409,
+                            detail="Тренировка изменилась, повторите запрос")
+
+    await refresh_week_stats(db, training.diary_id, [training.date])
+    await publish_event(db, training.diary_id, "training.finished",
+                        training_id=training.id,
+                        start_at=training.start_at,
+                        end_at=training.end_at)
+    await db.commit()
+    await pin_to_primary(current_user["id"])
+    return ModelResponse(TrainingOut.model_validate(training))
 
-    if not training:
-        raise HTTPException(status_code=404,
-                            detail="Тренировка не найдена")
-    if training.diary_id != diary.id:
+
+@router.post("/{training_id}/sets", response_model=TrainingSetsAppended,
+             status_code=201)
+async def append_training_sets(
+    training_id: int,
+    sets: Annotated[list[TrainingSetCreate],
+                    Body(min_length=1, max_length=BATCH_SIZE_MAX)],
+    current_user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Клиент отправляет выполненные подходы пачкой. Подход с уже
+    записанными упражнением и номером пропускается, так что повтор запроса
+    после обрыва безопасен"""
+    if current_user["role"] != "client":
         raise HTTPException(status_code=403,
-                            detail="Это не ваша тренировка")
-    if training.start_at is None:
-        raise HTTPException(status_code=400,
-                            detail="Тренировка ещё не начата")
-    if training.end_at is not None:
-        raise HTTPException(status_code=400,
-                            detail="Тренировка уже завершена")
+                            detail="Только клиент может записывать подходы")
+
+    diary_id = await get_my_diary_id(current_user, db)
+
+    rows = values(
+        column("exercise_id", Integer),
+        column("set_number", Integer),
+        column("reps", Integer),
+        column("weight", Numeric(6, 2)),
+        column("duration", Integer),
+        column("completed_at", TIMESTAMP(timezone=True)),
+        name="payload",
+    ).data([
+        (s.exercise_id, s.set_number, s.reps, s.weight, s.duration,
+         s.completed_at)
+        for s in sets
+    ])
+    # Владелец, состояние тренировки и упражнения проверяются JOIN-ами
+    # в самой вставке: строки, не прошедшие проверку, просто не вставятся
+    result = await db.execute(
+        pg_insert(TrainingSet)
+        .from_select(
+            ("training_exercise_id", *_TRAINING_SET_COLUMNS, "completed_at"),
+            select(
+                TrainingExercise.id,
+                *(cast(rows.c[name], rows.c[name].type)
+                  for name in _TRAINING_SET_COLUMNS),
+                func.coalesce(cast(rows.c.completed_at,
+                                   rows.c.completed_at.type),
+                              func.now()),
+            )
+            .join(TrainingExercise,
+                  and_(TrainingExercise.training_id == training_id,
+                       TrainingExercise.exercise_id == rows.c.exercise_id))
+            .join(Training, Training.id == TrainingExercise.training_id)
+            .where(Training.diary_id == diary_id,
+                   Training.start_at.is_not(None)),
+        )
+        .on_conflict_do_nothing(constraint="uq_training_set")
+        .returning(TrainingSet.id)
+    )
+    inserted = len(result.all())
+
+    if inserted < len(sets):
+        # Пропуски — это повторы либо ошибка в запросе; различаем только
+        # здесь, чтобы обычная запись оставалась одним запросом
+        state = await _training_state(db, training_id, current_user)
+        if state.start_at is None:
+            raise HTTPException(status_code=400,
+                                detail="Тренировка ещё не начата")
+        result = await db.execute(
+            select(TrainingExercise.exercise_id)
+            .where(TrainingExercise.training_id == training_id)
+        )
+        missing = {s.exercise_id for s in sets} - set(result.scalars())
+        if missing:
+            await db.rollback()
+            raise HTTPException(status_code=404,
+                                detail=f"Упражнения нет в тренировке: "
+                                       f"{missing}")
 
-    training.end_at = datetime.utcnow()
+    if inserted:
+        await publish_event(db, diary_id, "sets.logged",
+                            training_id=training_id, count=inserted)
     await db.commit()
-    await db.refresh(training)
+    await pin_to_primary(current_user["id"])
+    return ModelResponse(
+        TrainingSetsAppended(inserted=inserted,
+                             duplicates=len(sets) - inserted),
+        status_code=201,
+    )
 
-    return TrainingOut.model_validate(training)
+
+@router.get("/{training_id}/sets", response_model=list[TrainingSetOut])
+async def get_training_sets(
+    training_id: int,
+    current_user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_user_read_db),
+):
+    diary_id = await get_my_diary_id(current_user, db)
+    result = await db.execute(
+        select(TrainingSet.id,
+               TrainingExercise.exercise_id,
+               *(getattr(TrainingSet, name)
+                 for name in _TRAINING_SET_COLUMNS),
+               TrainingSet.completed_at)
+        .join(TrainingExercise,
+              TrainingExercise.id == TrainingSet.training_exercise_id)
+        .join(Training, Training.id == TrainingExercise.training_id)
+        .where(Training.id == training_id, Training.diary_id == diary_id)
+        .order_by(TrainingExercise.order_index, TrainingSet.set_number)
+    )
+    sets = [TrainingSetOut.model_validate(dict(row))
+            for row in result.mappings()]
+    if not sets:
+        await _training_state(db, training_id, current_user)
+    return ModelResponse(sets)
 
 
 @router.delete("/{training_id}", status_code=204)
@@ -175,15 +503,17 @@ async def delete_training(
         raise HTTPException(status_code=403,
                             detail="Только тренер может удалять тренировки")
 
-    diary = await _get_my_diary(current_user, db)
+    diary_id = await get_my_diary_id(current_user, db)
     training = await db.get(Training, training_id)
 
     if not training:
         raise HTTPException(status_code=404, detail="Тренировка не найдена")
-    if training.diary_id != diary.id:
+    if training.diary_id != diary_id:
         raise HTTPException(status_code=403, detail="Это не ваша тренировка")
 
     await db.delete(training)
+    await refresh_week_stats(db, diary_id, [training.date])
     await db.commit()
+    await pin_to_primary(current_user["id"])
 
     return None
\ No newline at end of file
@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends
 
 from src.schemas.user import UserOut
+from src.core.responses import ModelResponse
 from src.dependencies.auth import get_current_user
 
 router = APIRouter(prefix="/users", tags=["users"])
@@ -8,4 +9,4 @@ router = APIRouter(prefix="/users", tags=["users"])
 
 @router.get("/me", response_model=UserOut)
 async def read_me(current_user: dict = Depends(get_current_user)):
-    return UserOut.model_validate(current_user)
\ No newline at end of file
+    return ModelResponse(UserOut.model_validate(current_user))
\ No newline at end of file
@@ -12,3 +12,7 @@ class ExerciseOut(ExerciseBase):
 
     class Config:
         from_attributes = True
+
+class ExercisePage(BaseModel):
+    items: list[ExerciseOut]
+    next_cursor: str | None = None
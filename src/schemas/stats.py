@@ -0,0 +1,28 @@
+from datetime import date
+
+from pydantic import BaseModel
+
+class WeekStatsOut(BaseModel):
+    week_start: date
+    trainings: int
+    completed: int
+    adherence: float
+    avg_duration_seconds: float | None = None
+    volume: float
+
+class ExerciseWeekStatsOut(BaseModel):
+    week_start: date
+    exercise_id: int
+    trainings: int
+    sets: int
+    volume: float
+
+    class Config:
+        from_attributes = True
+
+class DiaryStats(BaseModel):
+    diary_id: int
+    date_from: date
+    date_to: date
+    weeks: list[WeekStatsOut]
+    exercises: list[ExerciseWeekStatsOut]
@@ -1,6 +1,6 @@
 from datetime import date, datetime
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, field_validator
 
 class TrainingExerciseBase(BaseModel):
     exercise_id: int
@@ -28,10 +28,78 @@ class TrainingCreate(TrainingBase):
     diary_id: int
     exercises: list[TrainingExerciseCreate] = []
 
+    @field_validator("exercises")
+    @classmethod
+    def _unique_exercises(cls, value: list[TrainingExerciseCreate]):
+        # Иначе вставка упрётся в uq_training_exercise и вернёт 500
+        seen, duplicates = set(), set()
+        for ex in value:
+            (duplicates if ex.exercise_id in seen else seen).add(
+                ex.exercise_id)
+        if duplicates:
+            raise ValueError(f"Упражнения повторяются: "
+                             f"{sorted(duplicates)}")
+        return value
+
 class TrainingOut(TrainingBase):
     id: int
     diary_id: int
     exercises: list[TrainingExerciseOut] = []
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class TrainingPage(BaseModel):
+    items: list[TrainingOut]
+    next_cursor: str | None = None
+
+class TrainingExerciseColumns(BaseModel):
+    """Упражнения тренировки параллельными массивами: i-е элементы всех
+    массивов — одно упражнение"""
+    id: list[int] = []
+    exercise_id: list[int] = []
+    order_index: list[int] = []
+    sets_count: list[int] = []
+    set_duration: list[int | None] = []
+    weight: list[float | None] = []
+
+class TrainingCompactOut(TrainingBase):
+    id: int
+    diary_id: int
+    exercises: TrainingExerciseColumns = TrainingExerciseColumns()
+
+    @field_validator("exercises", mode="before")
+    @classmethod
+    def _to_columns(cls, value):
+        if isinstance(value, (list, tuple)):
+            return {name: [getattr(ex, name) for ex in value]
+                    for name in TrainingExerciseColumns.model_fields}
+        return value
+
+    class Config:
+        from_attributes = True
+
+class TrainingCompactPage(BaseModel):
+    items: list[TrainingCompactOut]
+    next_cursor: str | None = None
+
+class TrainingSetCreate(BaseModel):
+    exercise_id: int
+    set_number: int = Field(ge=1)
+    reps: int | None = Field(default=None, ge=0)
+    weight: float | None = Field(default=None, ge=0)
+    duration: int | None = Field(default=None, ge=0)
+    completed_at: datetime | None = None
+
+class TrainingSetOut(BaseModel):
+    id: int
+    exercise_id: int
+    set_number: int
+    reps: int | None = None
+    weight: float | None = None
+    duration: int | None = None
+    completed_at: datetime
+
+class TrainingSetsAppended(BaseModel):
+    inserted: int
+    duplicates: int
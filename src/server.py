@@ -0,0 +1,85 @@
+"""Production-запуск: несколько воркеров uvicorn, uvloop и httptools, если
+они установлены.
+
+    python -m src.server
+
+DB_POOL_SIZE и DB_MAX_OVERFLOW здесь — бюджет соединений на весь сервер,
+он делится между воркерами. Для разработки с автоперезагрузкой остаётся
+`python -m src.main`.
+"""
+import os
+import logging
+from math import ceil
+from importlib.util import find_spec
+
+logger = logging.getLogger("uvicorn.error")
+
+
+def resolve_workers(requested: int) -> int:
+    """0 — по числу доступных процессу CPU"""
+    if requested > 0:
+        return requested
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0)) or 1
+    return os.cpu_count() or 1
+
+
+def split_pool(pool_size: int, max_overflow: int,
+               workers: int) -> tuple[int, int]:
+    """Делит серверный бюджет соединений между воркерами"""
+    return max(1, pool_size // workers), max_overflow // workers
+
+
+def _available(module: str, preferred: str, fallback: str) -> str:
+    return preferred if find_spec(module) is not None else fallback
+
+
+def main() -> None:
+    import uvicorn
+    from src.core.config import get_settings, validate_settings
+
+    logging.basicConfig(level=logging.INFO,
+                        format="%(levelname)s:     %(message)s")
+
+    settings = get_settings()
+    workers = resolve_workers(settings.SERVER.SERVER_WORKERS)
+    pool_size, max_overflow = split_pool(settings.DB.DB_POOL_SIZE,
+                                         settings.DB.DB_MAX_OVERFLOW, workers)
+
+    # Воркеры собирают настройки заново, а переменные окружения важнее .env
+    os.environ.update({
+        "SERVER_WORKERS": str(workers),
+        "DB_POOL_SIZE": str(pool_size),
+        "DB_MAX_OVERFLOW": str(max_overflow),
+    })
+    get_settings.cache_clear()
+    settings = get_settings()
+    for warning in validate_settings(settings):
+        logger.warning("Настройки: %s", warning)
+
+    server = settings.SERVER
+    loop = _available("uvloop", "uvloop", "asyncio")
+    http = _available("httptools", "httptools", "h11")
+    logger.info("Starting %d workers (loop=%s, http=%s), DB pool %d+%d "
+                "per worker", workers, loop, http, pool_size, max_overflow)
+
+    uvicorn.run(
+        "src.main:create_app",
+        factory=True,
+        host=server.SERVER_HOST,
+        port=server.SERVER_PORT,
+        workers=workers,
+        loop=loop,
+        http=http,
+        backlog=server.SERVER_BACKLOG,
+        timeout_keep_alive=server.SERVER_KEEP_ALIVE,
+        limit_concurrency=server.SERVER_LIMIT_CONCURRENCY or None,
+        limit_max_requests=server.SERVER_MAX_REQUESTS or None,
+        # Сколько uvicorn ждёт незавершённые запросы перед lifespan shutdown
+        timeout_graceful_shutdown=ceil(settings.SHUTDOWN_DRAIN_TIMEOUT),
+        proxy_headers=True,
+    )
+
+
+if __name__ == "__main__":
+    main()
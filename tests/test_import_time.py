@@ -0,0 +1,41 @@
+"""Бюджеты времени старта (benchmarks.import_time) для того, что реально
+выполняется: импорт src.main, create_app() в каждом воркере uvicorn и
+src.db.session, который импортируют alembic и тесты.
+
+Каждый случай идёт в отдельном интерпретаторе, база не нужна: create_app()
+не открывает соединений, а недостающие настройки подставляются.
+"""
+import os
+
+import pytest
+
+from benchmarks.import_time import check
+
+# Бюджеты с запасом примерно в два раза от замеров, чтобы тест ловил
+# регрессии вроде тяжёлого импорта на уровне модуля, а не шум машины
+CASES = [
+    ("import src.main", 150.0,
+     ("fastapi", "sqlalchemy", "asyncpg", "passlib", "jose")),
+    # asyncpg — при первом соединении, passlib и jose — при первом
+    # хэше или токене
+    ("from src.main import create_app; create_app()", 2500.0,
+     ("asyncpg", "passlib", "jose")),
+    ("import src.db.session", 1500.0,
+     ("fastapi", "starlette", "passlib", "jose")),
+]
+
+
+@pytest.fixture(scope="module")
+def env() -> dict[str, str]:
+    env = dict(os.environ)
+    for name, value in (("DB_PASS", "x"), ("DB_NAME", "x"),
+                        ("SECRET_KEY", "x")):
+        env.setdefault(name, value)
+    return env
+
+
+@pytest.mark.parametrize(("code", "budget_ms", "forbidden"), CASES,
+                         ids=[code for code, _, _ in CASES])
+def test_startup_within_budget(code, budget_ms, forbidden, env):
+    report = check(code, budget_ms, forbidden, rounds=3, env=env)
+    assert not report["violations"], report
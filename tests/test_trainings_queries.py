@@ -0,0 +1,129 @@
+"""Число SQL-запросов на страницу GET /trainings не должно расти с числом
+тренировок (selectin-загрузка упражнений вместо N+1).
+
+Нужна база из настроек (.env или переменные окружения DB_*); если
+настроек нет или база недоступна, тест пропускается. Схема создаётся в
+отдельной временной схеме внутри транзакции, которая откатывается вместе
+со всеми данными, так что в настроенной базе ничего не остаётся.
+"""
+import asyncio
+import uuid
+from datetime import date, timedelta
+
+import httpx
+import pytest
+from pydantic import ValidationError
+from sqlalchemy import event, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.pool import NullPool
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from src.core.config import get_settings
+from src.db.base import Base
+from src.dependencies.auth import get_current_user, get_user_read_db
+from src.main import create_app
+from src.models import Diary, Exercise, Training, User
+from src.models.training import TrainingExercise
+from src.routers.trainings import PAGE_SIZE_MAX
+
+EXERCISES_PER_TRAINING = 3
+
+
+async def _seed(session: AsyncSession, trainings: int) -> dict:
+    trainer = User(first_name="t", second_name="t",
+                   email=f"queries-{uuid.uuid4().hex}@ex.com",
+                   password_hash="x", role="trainer")
+    exercises = [Exercise(name=f"Queries {i}")
+                 for i in range(EXERCISES_PER_TRAINING)]
+    session.add_all([trainer, *exercises])
+    await session.flush()
+    diary = Diary(name="Queries", trainer_id=trainer.id)
+    session.add(diary)
+    await session.flush()
+    session.add_all([
+        Training(diary_id=diary.id, name=f"T{i}",
+                 date=date(2025, 1, 1) + timedelta(days=i),
+                 exercises=[
+                     TrainingExercise(exercise_id=ex.id,
+                                      order_index=j, sets_count=3)
+                     for j, ex in enumerate(exercises)
+                 ])
+        for i in range(trainings)
+    ])
+    await session.flush()
+    session.expunge_all()
+    return {"id": trainer.id, "email": trainer.email, "first_name": "t",
+            "second_name": "t", "role": "trainer"}
+
+
+async def _count_page_queries(trainings: int) -> tuple[int, dict]:
+    """Запросов на страницу GET /trainings?limit=PAGE_SIZE_MAX для
+    дневника с trainings тренировками и её тело"""
+    try:
+        settings = get_settings()
+        engine = create_async_engine(settings.DB.get_async_url(),
+                                     poolclass=NullPool)
+        conn = await engine.connect()
+    except (ValidationError, DBAPIError, OSError) as exc:
+        pytest.skip(f"База недоступна: {exc}")
+
+    try:
+        transaction = await conn.begin()
+        try:
+            schema = f"test_queries_{uuid.uuid4().hex}"
+            await conn.execute(text(f'CREATE SCHEMA "{schema}"'))
+            # public — для расширений вроде pg_trgm
+            await conn.execute(
+                text(f'SET LOCAL search_path TO "{schema}", public'))
+            await conn.run_sync(Base.metadata.create_all)
+        except DBAPIError as exc:
+            await transaction.rollback()
+            pytest.skip(f"Не удалось создать схему: {exc}")
+
+        session = AsyncSession(bind=conn, expire_on_commit=False)
+        user = await _seed(session, trainings)
+
+        async def read_db():
+            yield session
+
+        app = create_app()
+        app.dependency_overrides[get_current_user] = lambda: user
+        app.dependency_overrides[get_user_read_db] = read_db
+
+        statements = []
+
+        def on_execute(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(engine.sync_engine, "before_cursor_execute", on_execute)
+        try:
+            async with httpx.AsyncClient(
+                    transport=httpx.ASGITransport(app=app),
+                    base_url="http://test") as client:
+                response = await client.get(
+                    "/trainings/", params={"limit": PAGE_SIZE_MAX})
+        finally:
+            event.remove(engine.sync_engine, "before_cursor_execute",
+                         on_execute)
+
+        assert response.status_code == 200, response.text
+        await session.close()
+        await transaction.rollback()
+        return len(statements), response.json()
+    finally:
+        await conn.close()
+        await engine.dispose()
+
+
+def test_trainings_page_loads_in_fixed_number_of_queries():
+    small, small_page = asyncio.run(_count_page_queries(5))
+    large, large_page = asyncio.run(_count_page_queries(500))
+
+    assert len(small_page["items"]) == 5
+    assert len(large_page["items"]) == PAGE_SIZE_MAX
+    assert all(len(item["exercises"]) == EXERCISES_PER_TRAINING
+               for item in large_page["items"])
+    assert large == small
+    # Дневник пользователя, страница тренировок и одним IN-запросом все
+    # их упражнения
+    assert large == 3